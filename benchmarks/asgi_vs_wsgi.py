@@ -0,0 +1,166 @@
+"""
+Throughput and tail latency of the catalog reads under WSGI and ASGI.
+
+    python -m benchmarks.asgi_vs_wsgi [--connections 1,16,64,256] [--requests N]
+
+Three stacks are driven in-process, without sockets, so the numbers compare
+the request handling rather than an HTTP server:
+
+``wsgi``
+    The DRF viewsets through ``ecomm.wsgi``, one thread per connection, as a
+    threaded WSGI server would run them.
+``asgi-sync``
+    The same viewsets through ``ecomm.asgi``; Django runs each one in a
+    worker thread.
+``asgi``
+    The async views in ``commerce.async_views`` through ``ecomm.asgi``, one
+    coroutine per connection.
+
+Each connection issues its requests back to back. The response cache is
+swapped for a dummy backend so every request reaches the database.
+"""
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import argument_parser, prepare_database, split, summarise
+
+ENDPOINTS = {
+    'product-list': ('/api/products/', '/api/async/products/', 'page_size=20'),
+    'product-search': ('/api/products/', '/api/async/products/',
+                       'search=product&page_size=20'),
+    'product-detail': ('/api/products/{pk}/', '/api/async/products/{pk}/', ''),
+    'category-list': ('/api/categories/', '/api/async/categories/', ''),
+}
+
+
+def wsgi_environ(path, query):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+    }
+
+
+def run_wsgi(app, path, query, connections, total):
+    def one():
+        environ = wsgi_environ(path, query)
+        statuses = []
+        started = time.perf_counter()
+        body = b''.join(app(environ, lambda status, headers: statuses.append(status)))
+        elapsed = time.perf_counter() - started
+        assert statuses[0].startswith('200'), (statuses[0], body[:200])
+        return elapsed
+
+    def client(count):
+        return [one() for _ in range(count)]
+
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        started = time.perf_counter()
+        batches = list(pool.map(client, split(total, connections)))
+        wall = time.perf_counter() - started
+    return wall, [sample for batch in batches for sample in batch]
+
+
+def run_asgi(app, path, query, connections, total):
+    async def one():
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'application/json')],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        requested = False
+        disconnected = asyncio.Event()
+        messages = []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        elapsed = time.perf_counter() - started
+        disconnected.set()
+        assert messages[0]['status'] == 200, messages
+        return elapsed
+
+    async def client(count):
+        return [await one() for _ in range(count)]
+
+    async def main():
+        started = time.perf_counter()
+        batches = await asyncio.gather(*(client(count)
+                                         for count in split(total, connections)))
+        return time.perf_counter() - started, batches
+
+    wall, batches = asyncio.run(main())
+    return wall, [sample for batch in batches for sample in batch]
+
+
+def main():
+    parser = argument_parser(__doc__)
+    parser.add_argument('--connections', default='1,16,64,256',
+                        help='comma-separated concurrent connection counts')
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='requests per stack and connection count')
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS),
+                        default='product-list')
+    parser.add_argument('--stacks', default='wsgi,asgi-sync,asgi')
+    options = parser.parse_args()
+    prepare_database(options)
+
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from commerce.models import Product
+
+    settings.ALLOWED_HOSTS = ['localhost']
+    settings.CACHES['benchmark-dummy'] = {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    settings.CATALOG_CACHE_ALIAS = 'benchmark-dummy'
+
+    sync_path, async_path, query = ENDPOINTS[options.endpoint]
+    pk = Product.objects.order_by('pk').values_list('pk', flat=True).first()
+    sync_path, async_path = sync_path.format(pk=pk), async_path.format(pk=pk)
+    stacks = {
+        'wsgi': lambda c, n: run_wsgi(get_wsgi_application(), sync_path, query, c, n),
+        'asgi-sync': lambda c, n: run_asgi(get_asgi_application(), sync_path, query, c, n),
+        'asgi': lambda c, n: run_asgi(get_asgi_application(), async_path, query, c, n),
+    }
+
+    print(f'{options.endpoint}: {options.requests} requests per run')
+    print(f'{"stack":<10} {"conns":>6} {"req/s":>9} {"p50 ms":>9} '
+          f'{"p95 ms":>9} {"p99 ms":>9}')
+    for connections in (int(value) for value in options.connections.split(',')):
+        for name in options.stacks.split(','):
+            stacks[name](connections, min(options.requests, 50))  # warm up
+            result = summarise(*stacks[name](connections, options.requests))
+            print(f'{name:<10} {connections:>6} {result["rps"]:>9.0f} '
+                  f'{result["p50"]:>9.2f} {result["p95"]:>9.2f} {result["p99"]:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Shared setup for the scripts in this package.
+
+Benchmarks run against their own SQLite file (``--db``), never the
+development database, and seed it with ``commerce.seeding.BulkSeeder`` the
+first time. Run them from the repository root, e.g.::
+
+    python -m benchmarks.index_plan --orders 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB = ROOT / 'benchmarks' / '.data' / 'bench.sqlite3'
+
+
+def argument_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--db', default=str(DEFAULT_DB),
+                        help='SQLite file to seed and query (default: %(default)s)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--orders', type=int, default=500000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    return parser
+
+
+def setup_django(db_path):
+    """Point the default database at ``db_path`` and initialise Django."""
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecomm.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.DEBUG = False
+
+    import django
+    django.setup()
+
+
+def prepare_database(options):
+    """Migrate ``options.db`` and bulk-seed it if it has no orders yet."""
+    Path(options.db).parent.mkdir(parents=True, exist_ok=True)
+    setup_django(options.db)
+
+    from django.core.management import call_command
+    from commerce.models import Order
+    from commerce.seeding import BulkSeeder
+
+    call_command('migrate', verbosity=0)
+    if not Order.objects.exists():
+        BulkSeeder(seed=options.seed, workers=options.workers,
+                   batch_size=10000, report=lambda line: print(line, file=sys.stderr)).run(
+            users=options.users, categories=options.categories,
+            products=options.products, orders=options.orders)
+
+
+def split(total, parts):
+    """``total`` requests shared out as evenly as possible over ``parts``."""
+    share, extra = divmod(total, parts)
+    return [share + (1 if index < extra else 0) for index in range(parts)]
+
+
+def summarise(wall, samples):
+    """Throughput and p50/p95/p99 (ms) of per-request ``samples`` in seconds."""
+    samples = sorted(sample * 1000 for sample in samples)
+
+    def percentile(fraction):
+        return samples[int(fraction * (len(samples) - 1))]
+
+    return {
+        'rps': len(samples) / wall,
+        'p50': statistics.median(samples),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+    }
+
+
+def measure(fn, repeat=20, warmup=2):
+    """Median and p95 wall time of ``fn()`` in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
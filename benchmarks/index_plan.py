@@ -0,0 +1,89 @@
+"""
+EXPLAIN plans and latency for the list/filter queries with and without the
+``Meta.indexes`` on Category, Product and Order.
+
+    python -m benchmarks.index_plan [--orders N] [--repeat N]
+
+The indexes are dropped for the "before" run and recreated (then ANALYZEd)
+for the "after" run, so the database is left as migrated.
+"""
+from benchmarks.common import argument_parser, measure, prepare_database
+
+
+def queries():
+    from commerce.models import Category, Order, Product
+
+    product = Product.objects.order_by('pk').values('price', 'pk', 'category_id')[
+        Product.objects.count() // 2]
+    user_id = Order.objects.order_by('pk').values_list('user_id', flat=True).first()
+    category_name = Category.objects.values_list('name', flat=True).first()
+
+    return [
+        ('products by price, first page',
+         lambda: Product.objects.order_by('price', 'pk')[:10]),
+        ('products by price, deep keyset page',
+         lambda: Product.objects.filter(price__gt=product['price'])
+         .order_by('price', 'pk')[:10]),
+        ('products by -stock, first page',
+         lambda: Product.objects.order_by('-stock', '-pk')[:10]),
+        ('category products by price',
+         lambda: Product.objects.filter(category_id=product['category_id'])
+         .order_by('price')[:10]),
+        ('orders newest first',
+         lambda: Order.objects.order_by('-created_at', '-pk')[:10]),
+        ('orders by total_price',
+         lambda: Order.objects.order_by('total_price', 'pk')[:10]),
+        ("one user's orders, newest first",
+         lambda: Order.objects.filter(user_id=user_id).order_by('-created_at', '-id')[:10]),
+        ('category by exact name',
+         lambda: Category.objects.filter(name=category_name)),
+    ]
+
+
+def run(label, plan, repeat):
+    print(f'\n== {label} ==')
+    results = {}
+    for name, build in plan:
+        median, p95 = measure(lambda: list(build()), repeat=repeat)
+        results[name] = median
+        print(f'\n{name}: median {median:.2f} ms, p95 {p95:.2f} ms')
+        for line in build().explain().splitlines():
+            print(f'    {line}')
+    return results
+
+
+def main():
+    parser = argument_parser(__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    options = parser.parse_args()
+    prepare_database(options)
+
+    from django.db import connection
+    from commerce.models import Category, Order, Product
+
+    indexed = [(model, index) for model in (Category, Product, Order)
+               for index in model._meta.indexes]
+    plan = queries()
+
+    with connection.schema_editor() as editor:
+        for model, index in indexed:
+            editor.remove_index(model, index)
+    try:
+        before = run('without indexes', plan, options.repeat)
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexed:
+                editor.add_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    after = run('with indexes', plan, options.repeat)
+
+    print('\n== summary (median ms) ==')
+    width = max(len(name) for name in before)
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float('inf')
+        print(f'{name:<{width}}  {before[name]:>9.2f}  {after[name]:>9.2f}  {speedup:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Render and parse times for DRF's JSON classes and ``commerce.renderers``.
+
+    python -m benchmarks.json_encoding [--rows 1000] [--repeat 50]
+
+Payloads are shaped like a page of ``ProductSerializer`` and
+``OrderSerializer`` output, once as the serializers emit them (prices and
+dates already strings) and once with raw ``Decimal``/``datetime`` values, as
+``values()`` rows or ad hoc responses carry them. No database is needed.
+"""
+import argparse
+import datetime
+import random
+from decimal import Decimal
+from io import BytesIO
+
+from benchmarks.common import DEFAULT_DB, measure, setup_django
+
+
+def products(rows, raw):
+    rng = random.Random(0)
+    for pk in range(1, rows + 1):
+        price = Decimal(rng.randrange(100, 100000)) / 100
+        yield {
+            'id': pk,
+            'name': f'Product {pk}',
+            'description': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 3,
+            'price': price if raw else f'{price:.2f}',
+            'stock': rng.randrange(0, 500),
+            'image': f'http://testserver/media/products/{pk}.png' if pk % 3 else None,
+            'category': rng.randrange(1, 50),
+            'created_by': rng.randrange(1, 1000),
+        }
+
+
+def orders(rows, raw):
+    rng = random.Random(0)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    for pk in range(1, rows + 1):
+        items = [{'product': rng.randrange(1, 50000),
+                  'quantity': rng.randrange(1, 4),
+                  'unit_price': Decimal(rng.randrange(100, 100000)) / 100}
+                 for _ in range(rng.randrange(1, 6))]
+        total = sum(item['unit_price'] * item['quantity'] for item in items)
+        created_at = start + datetime.timedelta(seconds=rng.randrange(10 ** 7),
+                                                microseconds=rng.randrange(10 ** 6))
+        if not raw:
+            for item in items:
+                item['unit_price'] = f'{item["unit_price"]:.2f}'
+        yield {
+            'id': pk,
+            'user': rng.randrange(1, 1000),
+            'products': [item['product'] for item in items],
+            'items': items,
+            'total_price': total if raw else f'{total:.2f}',
+            'created_at': created_at if raw else
+            created_at.isoformat()[:23] + 'Z',
+        }
+
+
+def page(results):
+    return {'next': 'http://testserver/api/products/?cursor=cD0xMA%3D%3D',
+            'previous': None, 'results': list(results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    options = parser.parse_args()
+    setup_django(str(DEFAULT_DB))
+
+    from rest_framework import parsers, renderers
+    from commerce import renderers as commerce_renderers
+
+    drf_renderer = renderers.JSONRenderer()
+    fast_renderer = commerce_renderers.JSONRenderer()
+    print(f'orjson: {"installed" if commerce_renderers.orjson else "not installed"}')
+    print(f'{"payload":<22} {"drf ms":>9} {"commerce ms":>12} {"speedup":>8}')
+
+    for name, build in [('products', products), ('orders', orders)]:
+        for raw in (False, True):
+            data = page(build(options.rows, raw))
+            assert fast_renderer.render(data) == drf_renderer.render(data)
+            drf, _ = measure(lambda: drf_renderer.render(data), options.repeat)
+            fast, _ = measure(lambda: fast_renderer.render(data), options.repeat)
+            label = f'render {name}{" (raw)" if raw else ""}'
+            print(f'{label:<22} {drf:>9.2f} {fast:>12.2f} {drf / fast:>7.1f}x')
+
+    body = drf_renderer.render([
+        {'products': order['products'],
+         'items': [{'product': item['product'], 'quantity': item['quantity']}
+                   for item in order['items']]}
+        for order in orders(options.rows, raw=False)])
+    drf, _ = measure(lambda: parsers.JSONParser().parse(BytesIO(body)), options.repeat)
+    fast, _ = measure(lambda: commerce_renderers.JSONParser().parse(BytesIO(body)),
+                      options.repeat)
+    print(f'{"parse order bulk body":<22} {drf:>9.2f} {fast:>12.2f} {drf / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+"""
+Concurrent load test of the API routes, with JSON baselines.
+
+    python -m benchmarks.load [--clients 8] [--requests 400] [--scenarios a,b]
+    python -m benchmarks.load --save-baseline
+    python -m benchmarks.load --tolerance 0.25
+
+Seeds ``--db`` like the other benchmarks, then drives the real URL routes
+through ``ecomm.wsgi`` with ``--clients`` threads issuing requests back to
+back. Each scenario reports throughput, p50/p95/p99 latency and SQL queries
+per request (read from the ``Server-Timing`` header that
+``RequestMetricsMiddleware`` adds).
+
+``--save-baseline`` writes the results to ``--baseline``. Otherwise, when that
+file exists, the run is compared with it and exits with status 1 if any
+scenario lost more than ``--tolerance`` of its throughput, its p95 grew by
+more than ``--tolerance``, it makes more queries per request, or any request
+failed. Baselines are only meaningful on the machine that recorded them.
+
+The response cache is swapped for a dummy backend (``--with-cache`` keeps
+it) and the login throttles are lifted, so every request does the full work;
+the per-request log lines are silenced. Orders created by ``order-create``
+are deleted and stock restored afterwards.
+"""
+import io
+import json
+import logging
+import platform
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.common import ROOT, argument_parser, prepare_database, split, summarise
+
+DEFAULT_BASELINE = ROOT / 'benchmarks' / '.data' / 'load-baseline.json'
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def scenarios(fixtures):
+    """name -> (share of --requests, build(rng) -> request kwargs)."""
+    def get(url_name, **query):
+        return lambda rng: {'method': 'GET', 'path': fixtures['urls'][url_name],
+                            'query': query}
+
+    def create_order(rng):
+        products = rng.sample(fixtures['product_ids'], rng.randint(1, 3))
+        return {'method': 'POST', 'path': fixtures['urls']['order-list'],
+                'body': {'user': fixtures['admin_id'],
+                         'items': [{'product': pk, 'quantity': rng.randint(1, 2)}
+                                   for pk in products]},
+                'token': fixtures['admin_token']}
+
+    def login(rng):
+        return {'method': 'POST', 'path': fixtures['urls']['login'],
+                'body': {'username': rng.choice(fixtures['usernames']),
+                         'password': 'password'}}
+
+    return {
+        'category-list': (1.0, get('category-list')),
+        'product-list': (1.0, get('product-list', page_size=20)),
+        'product-search': (1.0, get('product-list', search=fixtures['search'],
+                                    ordering='price', page_size=20)),
+        'product-ordering': (1.0, get('product-list', ordering='-price',
+                                      page_size=20)),
+        'order-list': (1.0, get('order-list', page_size=20)),
+        'order-create': (0.5, create_order),
+        # PBKDF2 makes each login cost a few hundred milliseconds.
+        'login': (0.1, login),
+    }
+
+
+def call(app, method, path, query=None, body=None, token=None):
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '&'.join(f'{key}={value}' for key, value in (query or {}).items()),
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'HTTP_ACCEPT': 'application/json',
+        'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(payload),
+    }
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Token {token}'
+    started = []
+
+    def start_response(status, headers):
+        started.append((int(status.split()[0]), dict(headers)))
+
+    begun = time.perf_counter()
+    b''.join(app(environ, start_response))
+    elapsed = time.perf_counter() - begun
+    status, headers = started[0]
+    match = QUERIES.search(headers.get('Server-Timing', ''))
+    return elapsed, status, int(match.group(1)) if match else None
+
+
+def run_scenario(app, build, clients, total, seed):
+    def client(index, count):
+        rng = random.Random(seed * 1000 + index)
+        return [call(app, **build(rng)) for _ in range(count)]
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        begun = time.perf_counter()
+        batches = list(pool.map(client, range(clients), split(total, clients)))
+        wall = time.perf_counter() - begun
+
+    samples = [sample for batch in batches for sample in batch]
+    result = summarise(wall, [elapsed for elapsed, _, _ in samples])
+    queries = [count for _, _, count in samples if count is not None]
+    result.update(
+        requests=len(samples),
+        errors=sum(1 for _, status, _ in samples if status >= 400),
+        queries=max(queries, default=0),
+    )
+    return result
+
+
+def prepare_fixtures(rng):
+    from django.contrib.auth.models import User
+    from django.urls import reverse
+    from rest_framework.authtoken.models import Token
+    from commerce.models import Product
+
+    admin, _ = User.objects.get_or_create(
+        username='loadtest-admin', defaults={'is_staff': True, 'is_superuser': True})
+    product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+    name = Product.objects.order_by('pk').values_list('name', flat=True)[
+        len(product_ids) // 2]
+    return {
+        'urls': {url_name: reverse(url_name) for url_name in
+                 ('category-list', 'product-list', 'order-list', 'login')},
+        'admin_id': admin.pk,
+        'admin_token': Token.objects.get_or_create(user=admin)[0].key,
+        'product_ids': rng.sample(product_ids, min(50, len(product_ids))),
+        'usernames': list(User.objects.filter(username__startswith='loadtest')
+                          .exclude(pk=admin.pk)
+                          .order_by('pk').values_list('username', flat=True)[:50]),
+        'search': re.findall(r'\w+', name)[0].lower(),
+    }
+
+
+class restore_orders:
+    """Delete orders created inside the block and put stock back."""
+
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+
+    def __enter__(self):
+        from django.db.models import Max
+        from commerce.models import Order, Product
+        self.last_order = Order.objects.aggregate(Max('pk'))['pk__max'] or 0
+        self.stock = dict(Product.objects.filter(pk__in=self.product_ids)
+                          .values_list('pk', 'stock'))
+        Product.objects.filter(pk__in=self.product_ids).update(stock=10 ** 9)
+
+    def __exit__(self, *exc_info):
+        from commerce.models import Order, Product
+        Order.objects.filter(pk__gt=self.last_order).delete()
+        for pk, stock in self.stock.items():
+            Product.objects.filter(pk=pk).update(stock=stock)
+
+
+def regressions(results, baseline, tolerance):
+    problems = []
+    for name, current in results.items():
+        if current['errors']:
+            problems.append(f'{name}: {current["errors"]} failed requests')
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        if current['rps'] < base['rps'] * (1 - tolerance):
+            problems.append(f'{name}: {current["rps"]:.0f} req/s, '
+                            f'baseline {base["rps"]:.0f}')
+        if current['p95'] > base['p95'] * (1 + tolerance):
+            problems.append(f'{name}: p95 {current["p95"]:.2f} ms, '
+                            f'baseline {base["p95"]:.2f} ms')
+        if current['queries'] > base['queries']:
+            problems.append(f'{name}: {current["queries"]} queries per request, '
+                            f'baseline {base["queries"]}')
+    return problems
+
+
+def main():
+    parser = argument_parser(__doc__)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400,
+                        help='requests per scenario, before its share')
+    parser.add_argument('--scenarios', help='comma-separated subset to run')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--with-cache', action='store_true')
+    options = parser.parse_args()
+    prepare_database(options)
+
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from commerce.views import LoginView
+
+    settings.ALLOWED_HOSTS = ['localhost']
+    if not options.with_cache:
+        settings.CACHES['benchmark-dummy'] = {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        settings.CATALOG_CACHE_ALIAS = 'benchmark-dummy'
+    LoginView.throttle_classes = []
+
+    rng = random.Random(options.seed)
+    fixtures = prepare_fixtures(rng)
+    plan = scenarios(fixtures)
+    names = options.scenarios.split(',') if options.scenarios else list(plan)
+    app = get_wsgi_application()
+    # After setup, which configures logging: one line per request would
+    # swamp the report (and the timings).
+    logging.getLogger('ecommerce').setLevel(logging.ERROR)
+
+    results = {}
+    print(f'{"scenario":<18} {"reqs":>6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} '
+          f'{"p99 ms":>8} {"queries":>8} {"errors":>7}')
+    with restore_orders(fixtures['product_ids']):
+        for name in names:
+            share, build = plan[name]
+            total = max(options.clients, int(options.requests * share))
+            run_scenario(app, build, options.clients, options.clients, options.seed)
+            result = results[name] = run_scenario(
+                app, build, options.clients, total, options.seed)
+            print(f'{name:<18} {result["requests"]:>6} {result["rps"]:>8.0f} '
+                  f'{result["p50"]:>8.2f} {result["p95"]:>8.2f} {result["p99"]:>8.2f} '
+                  f'{result["queries"]:>8} {result["errors"]:>7}')
+
+    report = {
+        'config': {key: getattr(options, key) for key in (
+            'users', 'categories', 'products', 'orders', 'seed', 'clients',
+            'requests', 'with_cache')},
+        'python': platform.python_version(),
+        'scenarios': results,
+    }
+    baseline_path = Path(options.baseline)
+    if options.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+        print(f'\nBaseline written to {baseline_path}')
+        return
+    if not baseline_path.exists():
+        print(f'\nNo baseline at {baseline_path}; run with --save-baseline first.')
+        return
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline['config'] != report['config']:
+        print('\nWarning: baseline was recorded with different options: '
+              f'{baseline["config"]}', file=sys.stderr)
+    problems = regressions(results, baseline, options.tolerance)
+    if problems:
+        print(f'\nRegressions beyond {options.tolerance:.0%}:')
+        for problem in problems:
+            print(f'  {problem}')
+        sys.exit(1)
+    print(f'\nNo regressions beyond {options.tolerance:.0%} of {baseline_path}.')
+
+
+if __name__ == '__main__':
+    main()
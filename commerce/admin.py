@@ -1,6 +1,16 @@
 from django.contrib import admin
-from .models import Category, Product, Order
+from .models import Category, Product, Order, OrderItem
 
 admin.site.register(Category)
 admin.site.register(Product)
-admin.site.register(Order)
\ No newline at end of file
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ['product']
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    inlines = [OrderItemInline]
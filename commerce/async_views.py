@@ -0,0 +1,211 @@
+"""
+Native async endpoints, for deployments served through ``ecomm.asgi``.
+
+DRF's ``APIView`` is synchronous, so these are plain Django async views that
+reuse DRF's parsers, throttles and error shapes. Password hashing runs on the
+bounded pool in ``commerce.hashing`` so the event loop stays free for other
+requests during a login burst, and throttles reject before any hashing.
+
+The catalog reads reuse the viewsets' querysets, filter backends, pagination
+and serializers, and only move the queries onto the async ORM, so their
+responses match the synchronous ``/api/categories/`` and ``/api/products/``.
+"""
+import functools
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException, NotFound, ParseError
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.request import Request
+
+from . import hashing
+from .authentication import token_expired
+from .middleware import serializing
+from .renderers import JSONParser, JSONRenderer
+from .throttling import (LoginIPRateThrottle, LoginUsernameRateThrottle,
+                         RegisterIPRateThrottle, throttle_wait)
+from .views import CategoryViewSet, ProductViewSet
+
+User = get_user_model()
+
+
+def require_methods(*methods):
+    """
+    Async counterpart of ``require_http_methods`` that also marks the view
+    CSRF exempt: these endpoints authenticate by token, never by cookie.
+    Django 4.2's own decorators wrap views in a sync function, which would
+    hide the coroutine from the handler.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _credentials(request, throttles):
+    """
+    Parse the body and apply ``throttles``. Returns ``(data, None)`` or
+    ``(None, error_response)``.
+    """
+    drf_request = Request(request, parsers=[JSONParser(), FormParser(),
+                                            MultiPartParser()])
+    try:
+        data = drf_request.data
+    except ParseError as exc:
+        return None, _error(str(exc.detail), 400)
+
+    wait = throttle_wait(drf_request, [throttle() for throttle in throttles])
+    if wait is not None:
+        response = _error('Request was throttled.', 429)
+        response['Retry-After'] = str(int(wait))
+        return None, response
+    return data, None
+
+
+async def _hash(func, *args):
+    try:
+        return await hashing.run(func, *args), None
+    except hashing.HashingPoolBusy:
+        response = _error('Server busy, retry shortly.', 503)
+        response['Retry-After'] = '1'
+        return None, response
+
+
+@require_methods('POST')
+async def register(request):
+    data, error = _credentials(request, [RegisterIPRateThrottle])
+    if error:
+        return error
+    username = data.get('username')
+    email = data.get('email') or ''
+    password = data.get('password')
+    if not username or not password:
+        return _error('Username and password are required', 400)
+
+    if await User.objects.filter(username=username).aexists():
+        return _error('Username already exists', 400)
+
+    password_hash, error = await _hash(make_password, password)
+    if error:
+        return error
+    user = User(username=User.normalize_username(username),
+                email=User.objects.normalize_email(email),
+                password=password_hash)
+    await user.asave()
+    token, created = await Token.objects.aget_or_create(user=user)
+    return JsonResponse({'token': token.key}, status=201)
+
+
+@require_methods('POST')
+async def login(request):
+    data, error = _credentials(request, [LoginIPRateThrottle,
+                                         LoginUsernameRateThrottle])
+    if error:
+        return error
+    username = data.get('username')
+    password = data.get('password')
+    if not username or password is None:
+        return _error('Invalid credentials', 401)
+
+    user = await User.objects.filter(
+        **{User.USERNAME_FIELD: username}).afirst()
+    if user is None:
+        # Hash anyway, as ModelBackend does, so response time doesn't reveal
+        # whether the account exists.
+        _, error = await _hash(make_password, password)
+        return error or _error('Invalid credentials', 401)
+
+    valid, error = await _hash(check_password, password, user.password)
+    if error:
+        return error
+    if not valid or not user.is_active:
+        return _error('Invalid credentials', 401)
+
+    token, created = await Token.objects.aget_or_create(user=user)
+    if token_expired(token):
+        await token.adelete()
+        token = await Token.objects.acreate(user=user)
+    return JsonResponse({'token': token.key}, status=200)
+
+
+def _render(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status,
+                        content_type='application/json')
+
+
+def _api_error(exc):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) \
+        else {'detail': exc.detail}
+    return _render(data, exc.status_code)
+
+
+def _viewset(viewset_class, request, action, **kwargs):
+    """An instance of ``viewset_class`` set up as the router would."""
+    return viewset_class(request=Request(request), args=(), kwargs=kwargs,
+                         format_kwarg=None, action=action)
+
+
+async def _list(request, viewset_class):
+    view = _viewset(viewset_class, request, 'list')
+    try:
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        page = paginator and paginator.get_page_queryset(queryset, view.request, view)
+    except APIException as exc:
+        return _api_error(exc)
+
+    # These views render their own responses, out of the middleware's sight,
+    # so the rendering is timed along with the serializing.
+    if page is None:
+        serializer = view.get_serializer([obj async for obj in queryset], many=True)
+        with serializing():
+            return _render(serializer.data)
+    results = paginator.set_page([obj async for obj in page])
+    serializer = view.get_serializer(results, many=True)
+    with serializing():
+        return _render(paginator.get_paginated_response(serializer.data).data)
+
+
+async def _detail(request, viewset_class, pk):
+    view = _viewset(viewset_class, request, 'retrieve', pk=pk)
+    queryset = view.get_queryset()
+    try:
+        instance = await queryset.aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        # Same message as get_object_or_404() in the synchronous views.
+        return _api_error(NotFound('No %s matches the given query.'
+                                   % queryset.model._meta.object_name))
+    serializer = view.get_serializer(instance)
+    with serializing():
+        return _render(serializer.data)
+
+
+@require_methods('GET', 'HEAD')
+async def category_list(request):
+    return await _list(request, CategoryViewSet)
+
+
+@require_methods('GET', 'HEAD')
+async def category_detail(request, pk):
+    return await _detail(request, CategoryViewSet, pk)
+
+
+@require_methods('GET', 'HEAD')
+async def product_list(request):
+    return await _list(request, ProductViewSet)
+
+
+@require_methods('GET', 'HEAD')
+async def product_detail(request, pk):
+    return await _detail(request, ProductViewSet, pk)
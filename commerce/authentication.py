@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def get_cache():
+    return caches[getattr(settings, 'TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _token_key(key):
+    return f'auth:token:{key}'
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def token_expiry():
+    seconds = getattr(settings, 'TOKEN_EXPIRY_SECONDS', None)
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def token_expired(token):
+    expiry = token_expiry()
+    return expiry is not None and token.created + expiry <= timezone.now()
+
+
+def forget_token(key):
+    get_cache().delete(_token_key(key))
+
+
+def forget_user(user_id):
+    cache = get_cache()
+    key = cache.get(_user_key(user_id))
+    if key is not None:
+        cache.delete_many([_token_key(key), _user_key(user_id)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` that keeps the token -> user resolution in the
+    cache for ``TOKEN_CACHE_TIMEOUT`` seconds instead of querying
+    ``authtoken_token JOIN auth_user`` on every request.
+
+    Entries are dropped when the token is deleted (logout/rotation) or the
+    user is saved, so deactivations and permission changes apply at once.
+    With ``TOKEN_EXPIRY_SECONDS`` set, tokens older than that are rejected
+    and deleted.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_cache()
+        token = cache.get(_token_key(key))
+        if token is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            timeout = getattr(settings, 'TOKEN_CACHE_TIMEOUT', 60)
+            expiry = token_expiry()
+            if expiry is not None:
+                remaining = (token.created + expiry - timezone.now()).total_seconds()
+                timeout = max(0, min(timeout, int(remaining)))
+            if timeout:
+                cache.set_many({_token_key(key): token,
+                                _user_key(token.user_id): key}, timeout)
+
+        if token_expired(token):
+            Token.objects.filter(key=key).delete()
+            forget_token(key)
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return (token.user, token)
@@ -0,0 +1,121 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+from . import replicas
+from .middleware import serializing
+
+# Query parameters that change a catalog response; anything else is ignored
+# when building the cache key so junk parameters cannot fragment the cache.
+CACHE_QUERY_PARAMS = ('search', 'ordering', 'cursor', 'page_size', 'include')
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _generation_key(model, pk=None):
+    label = model._meta.label_lower
+    if pk is None:
+        return f'catalog:{label}:gen'
+    return f'catalog:{label}:{pk}:gen'
+
+
+def _generation(key):
+    cache = get_cache()
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock rather than 1 so an evicted counter can never
+        # resurrect entries written under an earlier generation.
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate(model, pks=()):
+    """
+    Drop cached list responses for ``model`` and detail responses for
+    ``pks``. Runs immediately and again on commit, so a reader racing the
+    write transaction cannot re-cache pre-commit data.
+    """
+    keys = [_generation_key(model)] + [_generation_key(model, pk) for pk in pks]
+    get_cache().delete_many(keys)
+    transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def response_cache_key(request, model, pk=None):
+    params = sorted(
+        (name, value)
+        for name in CACHE_QUERY_PARAMS
+        for value in request.query_params.getlist(name)
+    )
+    fingerprint = hashlib.sha1(repr((
+        request.build_absolute_uri(request.path),
+        request.accepted_media_type,
+        params,
+    )).encode('utf-8')).hexdigest()
+    generation = _generation(_generation_key(model, pk))
+    return f'catalog:{model._meta.label_lower}:{generation}:{fingerprint}'
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for JSON ``list``/``retrieve`` responses.
+
+    Entries hold the rendered body plus its ETag, so a hit skips the ORM and
+    serialization entirely and a matching ``If-None-Match`` gets a 304.
+    Entries are invalidated by ``invalidate()``, called from the model
+    signals; ``CATALOG_CACHE_TIMEOUT`` is only a backstop. Responses read from
+    a replica are kept for ``REPLICA_CACHE_TIMEOUT`` (see ``commerce.replicas``).
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, args, kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.cached_response(request, super().retrieve, args, kwargs, pk)
+
+    def cached_response(self, request, handler, args, kwargs, pk=None):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(request, self.get_queryset().model, pk)
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            # Rendered here, so the middleware's render timing would miss it.
+            with serializing():
+                response.render()
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+            }
+            if not replicas.reading_from_replica():
+                cache.set(key, entry, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+            else:
+                # Possibly older than the write whose invalidation let this
+                # request miss; kept about as long as the replicas lag.
+                timeout = getattr(settings, 'REPLICA_CACHE_TIMEOUT', 5)
+                if timeout:
+                    cache.set(key, entry, timeout)
+        else:
+            response = HttpResponse(entry['content'],
+                                    content_type=entry['content_type'])
+
+        if entry['etag'] in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        response['ETag'] = entry['etag']
+        return response
@@ -0,0 +1,42 @@
+"""
+Denormalized per-category product statistics.
+
+``Category.product_count``, ``min_price`` and ``max_price`` are recomputed
+by ``refresh()`` with one ``UPDATE`` per call, whose correlated subqueries
+are answered from ``product_category_price_idx``. ``Product`` save and
+delete signals refresh the affected categories (both of them when a product
+moves); bulk and raw writes, which fire no signals, call ``refresh()``
+themselves.
+"""
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import cache
+from .models import Category, Product
+
+
+def _product_aggregate(aggregate, **kwargs):
+    return Subquery(
+        Product.objects.filter(category=OuterRef('pk'))
+        .order_by().values('category').annotate(value=aggregate).values('value'),
+        **kwargs)
+
+
+def refresh(category_ids=None, using='default'):
+    """
+    Recompute the statistics of ``category_ids``, or of every category when
+    ``None``, and drop their cached responses.
+    """
+    categories = Category.objects.using(using)
+    if category_ids is not None:
+        category_ids = {pk for pk in category_ids if pk is not None}
+        if not category_ids:
+            return
+        categories = categories.filter(pk__in=category_ids)
+    categories.update(
+        product_count=Coalesce(
+            _product_aggregate(Count('pk'), output_field=IntegerField()), Value(0)),
+        min_price=_product_aggregate(Min('price')),
+        max_price=_product_aggregate(Max('price')),
+    )
+    cache.invalidate(Category, category_ids or ())
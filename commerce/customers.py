@@ -0,0 +1,74 @@
+"""
+Per-customer order summaries for the "my orders" endpoint.
+
+``CustomerOrderSummary`` holds each user's order count and lifetime spend.
+Placing orders (the ``orders_placed`` signal) adds to it with one upsert per
+batch, inside the order transaction so the summary never disagrees with the
+orders a user can see; editing an order (``order_updated``) moves it from the
+summary it was counted in to its current user's, and deleting an order
+subtracts it. Writes that bypass the signals (raw SQL, bulk updates of
+orders) are repaired by ``rebuild()``.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import CustomerOrderSummary, Order
+from .reporting import upsert_totals
+
+SUMMARY_KEY = ('user_id',)
+SUMMARY_TOTALS = ('order_count', 'total_spent')
+REBUILD_BATCH_SIZE = 2000
+
+
+def aggregate_orders(orders, sign=1):
+    """``{(user_id,): [orders, spend]}`` for ``orders``."""
+    totals = defaultdict(lambda: [0, Decimal('0.00')])
+    for order in orders:
+        totals[(order.user_id,)][0] += sign
+        totals[(order.user_id,)][1] += sign * order.total_price
+    return totals
+
+
+def record_orders(orders, sign=1, using='default'):
+    """Add (or with ``sign=-1`` remove) ``orders`` from their users' summaries."""
+    totals = aggregate_orders(orders, sign)
+    if sign > 0:
+        upsert_totals(CustomerOrderSummary, SUMMARY_KEY, SUMMARY_TOTALS, totals, using)
+        return
+    # Never insert when removing: the user (and summary) may be going away in
+    # the same cascade.
+    for (user_id,), (count, spent) in totals.items():
+        CustomerOrderSummary.objects.using(using).filter(user_id=user_id).update(
+            order_count=F('order_count') + count, total_spent=F('total_spent') + spent)
+
+
+def record_update(previous, order, using='default'):
+    """Move ``order`` from the summary of ``previous``, as it was stored."""
+    if (previous.user_id, previous.total_price) != (order.user_id, order.total_price):
+        record_orders([previous], sign=-1, using=using)
+        record_orders([order], using=using)
+
+
+def summary_for(user, using='default'):
+    """The user's summary; an unsaved empty one if they never ordered."""
+    summary = CustomerOrderSummary.objects.using(using).filter(user=user).first()
+    return summary or CustomerOrderSummary(user=user)
+
+
+def rebuild(using='default', batch_size=REBUILD_BATCH_SIZE):
+    """Recompute every summary from the orders. Returns the rows written."""
+    rows = Order.objects.using(using).order_by().values('user_id').annotate(
+        order_count=Count('id'), total_spent=Sum('total_price'))
+    with transaction.atomic(using):
+        CustomerOrderSummary.objects.using(using).all().delete()
+        written, batch = 0, []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(CustomerOrderSummary(**row))
+            if len(batch) >= batch_size:
+                CustomerOrderSummary.objects.using(using).bulk_create(batch)
+                written, batch = written + len(batch), []
+        CustomerOrderSummary.objects.using(using).bulk_create(batch)
+    return written + len(batch)
@@ -0,0 +1,116 @@
+import csv
+import datetime
+import decimal
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.utils.dateparse import parse_datetime
+
+from .models import Order, OrderItem
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+
+PRODUCT_COLUMNS = ['id', 'sku', 'name', 'description', 'price', 'stock', 'image',
+                   'category_id', 'created_by_id']
+ORDER_COLUMNS = ['id', 'user_id', 'created_at', 'total_price']
+ORDER_ITEM_COLUMNS = ['product_id', 'quantity', 'unit_price']
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _chunks(iterator, size):
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def orders_created_between(created_after=None, created_before=None):
+    """Orders in ``[created_after, created_before)``, given as ISO 8601 strings."""
+    queryset = Order.objects.order_by('pk')
+    for value, lookup in ((created_after, 'created_at__gte'),
+                          (created_before, 'created_at__lt')):
+        if value:
+            moment = parse_datetime(value)
+            if moment is None:
+                raise ValueError(f'{value!r} is not an ISO 8601 datetime')
+            queryset = queryset.filter(**{lookup: moment})
+    return queryset
+
+
+def iter_products(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one dict per product, streamed through a server-side cursor."""
+    rows = queryset.values_list(*PRODUCT_COLUMNS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield dict(zip(PRODUCT_COLUMNS, map(_plain, row)))
+
+
+def iter_orders(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield one dict per order with its ``items``. Orders are streamed through a
+    server-side cursor and each chunk's lines are fetched with one query, so
+    memory stays bounded by ``chunk_size`` whatever the export size.
+    """
+    rows = queryset.values_list(*ORDER_COLUMNS).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        items = defaultdict(list)
+        lines = OrderItem.objects.filter(order_id__in=[row[0] for row in chunk]) \
+            .order_by('pk').values_list('order_id', *ORDER_ITEM_COLUMNS)
+        for order_id, *line in lines:
+            items[order_id].append(dict(zip(ORDER_ITEM_COLUMNS, map(_plain, line))))
+        for row in chunk:
+            order = dict(zip(ORDER_COLUMNS, map(_plain, row)))
+            order['items'] = items[row[0]]
+            yield order
+
+
+def to_ndjson(records):
+    for record in records:
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def to_csv(records, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for record in records:
+        yield writer.writerow([record[column] for column in columns])
+
+
+def product_export(queryset, export_format, chunk_size=CHUNK_SIZE):
+    records = iter_products(queryset, chunk_size)
+    if export_format == 'ndjson':
+        return to_ndjson(records)
+    return to_csv(records, PRODUCT_COLUMNS)
+
+
+def order_export(queryset, export_format, chunk_size=CHUNK_SIZE):
+    """NDJSON has one object per order; CSV has one row per order line."""
+    records = iter_orders(queryset, chunk_size)
+    if export_format == 'ndjson':
+        return to_ndjson(records)
+    columns = ['order_id'] + ORDER_COLUMNS[1:] + ORDER_ITEM_COLUMNS
+    lines = (
+        {'order_id': order['id'], **order, **item}
+        for order in records
+        for item in order['items']
+    )
+    return to_csv(lines, columns)
@@ -0,0 +1,160 @@
+"""
+Read-optimised list serialization.
+
+A ``ModelSerializer`` builds bound fields and walks ``to_representation`` per
+field per row. For flat, read-only list responses the same output can be
+produced from ``.values()`` rows by one generated function per serializer
+class, which maps each column straight to its output key and only calls a
+field's ``to_representation`` where it actually changes the value (decimals,
+dates, file URLs). Fields whose output depends on the request can provide
+``representation_for(context)``, returning the per-request converter.
+
+Serializers with fields that cannot be mapped to a single concrete column
+(nested serializers, method fields, dotted sources, many-to-many) are not
+compiled, and ``FastListMixin`` falls back to the regular serializer.
+"""
+import functools
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .middleware import serializing
+
+# Fields whose to_representation() returns a column value from .values()
+# unchanged.
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField,
+                   serializers.BooleanField, serializers.ReadOnlyField)
+
+
+class CompiledSerializer:
+    def __init__(self, columns, make_serialize, file_fields, context_fields):
+        self.columns = columns
+        self.make_serialize = make_serialize
+        self.file_fields = file_fields
+        self.context_fields = context_fields
+
+    def bind(self, context):
+        """Return ``serialize(row) -> dict`` for one request's ``context``."""
+        request = context.get('request')
+        converters = {name: file_url(storage, request)
+                      for name, storage in self.file_fields.items()}
+        for name, field in self.context_fields.items():
+            converters[name] = field.representation_for(context)
+        return self.make_serialize(**converters)
+
+
+def file_url(storage, request):
+    # Mirrors serializers.FileField.to_representation() with use_url.
+    def convert(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+    return convert
+
+
+def _model_field(model, field):
+    if len(field.source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    if not getattr(model_field, 'concrete', False) or model_field.many_to_many:
+        return None
+    return model_field
+
+
+@functools.lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    """
+    Compile ``serializer_class`` for ``.values()`` rows, or return ``None``
+    when one of its readable fields has no direct column equivalent.
+    """
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return None
+    serializer = serializer_class()
+    model = serializer.Meta.model
+
+    columns, items, converters, file_fields, context_fields = [], [], {}, {}, {}
+    for field in serializer._readable_fields:
+        if isinstance(field, (serializers.BaseSerializer,
+                              serializers.ManyRelatedField)):
+            return None
+        model_field = _model_field(model, field)
+        if model_field is None:
+            return None
+
+        column = model_field.attname
+        value = f'row[{column!r}]'
+        name = f'convert_{len(items)}'
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if not model_field.many_to_one or field.pk_field is not None \
+                    or not field.use_pk_only_optimization():
+                return None
+            expression = value
+        elif model_field.is_relation:
+            return None
+        elif isinstance(field, serializers.FileField):
+            if not isinstance(model_field, models.FileField) or \
+                    not getattr(field, 'use_url', True):
+                return None
+            file_fields[name] = model_field.storage
+            expression = f'{name}({value})'
+        elif hasattr(field, 'representation_for'):
+            context_fields[name] = field
+            expression = f'(None if (value := {value}) is None else {name}(value))'
+        elif type(field) in IDENTITY_FIELDS:
+            expression = value
+        else:
+            # Serializer.to_representation() never converts None.
+            converters[name] = field.to_representation
+            expression = f'(None if (value := {value}) is None else {name}(value))'
+
+        if column not in columns:
+            columns.append(column)
+        items.append(f'{field.field_name!r}: {expression}')
+
+    # Compiled once per serializer class; bind() only passes the converters
+    # that depend on the request into the closure.
+    source = (
+        'def make_serialize(%s):\n'
+        '    def serialize(row):\n'
+        '        return {%s}\n'
+        '    return serialize\n'
+    ) % (', '.join([*file_fields, *context_fields]), ', '.join(items))
+    namespace = dict(converters)
+    exec(compile(source, f'<fast {serializer_class.__qualname__}>', 'exec'), namespace)
+    return CompiledSerializer(columns, namespace['make_serialize'], file_fields,
+                              context_fields)
+
+
+class FastListMixin:
+    """
+    Serve ``list`` from ``.values()`` rows through ``compile_serializer()``,
+    producing the same JSON as the viewset's serializer. ``retrieve`` and
+    writes keep using the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        serialize = compiled.bind(self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset())
+        # Keep annotations (e.g. search_rank) selectable for the pagination
+        # cursor; they are not part of the output.
+        queryset = queryset.values(*compiled.columns, *queryset.query.annotations)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with serializing():
+                data = [serialize(row) for row in page]
+            return self.get_paginated_response(data)
+        with serializing():
+            data = [serialize(row) for row in queryset]
+        return Response(data)
@@ -0,0 +1,68 @@
+"""
+Bounded worker pool for password hashing.
+
+PBKDF2 runs hundreds of thousands of iterations; doing that on the event loop
+(or in every request thread) lets a burst of logins starve other requests.
+``hashlib`` releases the GIL while hashing, so a small thread pool gives real
+parallelism while capping how many hashes run at once. Work beyond
+``PASSWORD_HASHING_MAX_PENDING`` is refused with ``HashingPoolBusy`` rather
+than queued without limit.
+
+``run()`` is for async views; ``call()`` is the same for synchronous ones,
+which wait for the result but never hash more than the pool allows.
+"""
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+_lock = threading.Lock()
+_pending = 0
+
+
+class HashingPoolBusy(Exception):
+    pass
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 4),
+                thread_name_prefix='password-hashing',
+            )
+        return _executor
+
+
+@contextmanager
+def _slot():
+    global _pending
+    with _lock:
+        if _pending >= getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', 64):
+            raise HashingPoolBusy
+        _pending += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+async def run(func, *args):
+    """Run ``func(*args)`` on the hashing pool and await its result."""
+    executor = get_executor()
+    with _slot():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+
+def call(func, *args):
+    """Run ``func(*args)`` on the hashing pool and wait for its result."""
+    executor = get_executor()
+    with _slot():
+        return executor.submit(func, *args).result()
@@ -0,0 +1,157 @@
+"""
+Resized variants of product images, generated off the request.
+
+Saving a product with a new ``image`` clears ``Product.image_variants`` and,
+once the transaction commits, queues ``generate_variants()`` on a small
+thread pool (Pillow releases the GIL while decoding, resizing and encoding).
+Each variant in ``PRODUCT_IMAGE_VARIANTS`` is written in every format of
+``PRODUCT_IMAGE_FORMATS`` as ``products/variants/<hash>/<variant>.<ext>``,
+where ``<hash>`` is the SHA-256 of the source bytes: identical uploads share
+their files, and a file's content never changes under its URL, so the web
+server can serve ``MEDIA_URL/products/variants/`` with
+``Cache-Control: public, max-age=31536000, immutable``.
+
+Until the variants are ready (or if generation fails) ``image_variants`` is
+empty and clients fall back to ``image``.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import cache, sync
+from .models import Product
+
+logger = logging.getLogger('ecommerce')
+
+# name -> bounding box; images are scaled down to fit, never up.
+DEFAULT_VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1600, 1600),
+}
+DEFAULT_FORMATS = ('webp', 'jpeg')
+# Pillow format name, extension, save() options.
+ENCODINGS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANT_PREFIX = 'products/variants'
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_variants():
+    return getattr(settings, 'PRODUCT_IMAGE_VARIANTS', DEFAULT_VARIANTS)
+
+
+def get_formats():
+    return getattr(settings, 'PRODUCT_IMAGE_FORMATS', DEFAULT_FORMATS)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2),
+                thread_name_prefix='product-images',
+            )
+        return _executor
+
+
+def shutdown(wait=True):
+    """Stop the pool, by default after the queued images are done."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def _encode(image, format_name):
+    pillow_format, _, options = ENCODINGS[format_name]
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no alpha channel: flatten onto white.
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    output = io.BytesIO()
+    image.save(output, pillow_format, **options)
+    return output.getvalue()
+
+
+def render_variants(source, storage):
+    """
+    Write every variant of the image bytes ``source`` to ``storage`` and
+    return ``{variant: {format: name}}``. Files already present under the
+    content hash are reused.
+    """
+    digest = hashlib.sha256(source).hexdigest()
+    variants, image = {}, None
+    for variant, size in get_variants().items():
+        names = {}
+        resized = None
+        for format_name in get_formats():
+            name = f'{VARIANT_PREFIX}/{digest}/{variant}.{ENCODINGS[format_name][1]}'
+            if not storage.exists(name):
+                if image is None:
+                    image = ImageOps.exif_transpose(Image.open(io.BytesIO(source)))
+                    if image.mode not in ('RGB', 'RGBA'):
+                        image = image.convert('RGBA' if 'transparency' in image.info
+                                              or image.mode in ('LA', 'PA')
+                                              else 'RGB')
+                if resized is None:
+                    resized = image.copy()
+                    resized.thumbnail(size, Image.LANCZOS)
+                saved = storage.save(name, ContentFile(_encode(resized, format_name)))
+                if saved != name:
+                    # Another worker wrote the same content first.
+                    storage.delete(saved)
+            names[format_name] = name
+        variants[variant] = names
+    return variants
+
+
+def generate_variants(product_id, using='default'):
+    """Render the variants of a product's current image and store them."""
+    product = Product.objects.using(using).only('image').filter(pk=product_id).first()
+    if product is None or not product.image:
+        return None
+    image_name = product.image.name
+    with product.image.open('rb') as source:
+        variants = render_variants(source.read(), product.image.storage)
+    # Only if the image was not replaced meanwhile; that save queued its own
+    # job. A queryset update fires no signals, so invalidate explicitly.
+    updated = Product.objects.using(using).filter(pk=product_id, image=image_name) \
+        .update(image_variants=variants, updated_at=timezone.now(), version=None)
+    if updated:
+        cache.invalidate(Product, [product_id])
+        sync.stamp_on_commit(using)
+    return variants
+
+
+def _run(product_id, using):
+    close_old_connections()
+    try:
+        generate_variants(product_id, using)
+    except Exception:
+        logger.exception('Could not generate image variants for product %s',
+                         product_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(product_id, using='default'):
+    """Queue variant generation for when the current transaction commits."""
+    transaction.on_commit(lambda: get_executor().submit(_run, product_id, using),
+                          using=using)
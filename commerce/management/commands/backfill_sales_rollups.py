@@ -0,0 +1,55 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from commerce import reporting
+
+
+def iso_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Not a date (YYYY-MM-DD): {value}')
+
+
+class Command(BaseCommand):
+    help = 'Recompute the sales rollups behind /api/reports/ from the orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=iso_date,
+                            help='first day to rebuild (default: the first order)')
+        parser.add_argument('--end', type=iso_date,
+                            help='last day to rebuild (default: the last order)')
+        parser.add_argument('--days-per-batch', type=int, default=31,
+                            help='days recomputed per transaction when both '
+                                 '--start and --end are given')
+        parser.add_argument('--batch-size', type=int,
+                            default=reporting.REBUILD_BATCH_SIZE)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if start and end and start > end:
+            raise CommandError('--start must not be after --end')
+
+        windows = [(start, end)]
+        if start and end:
+            step = datetime.timedelta(days=max(1, options['days_per_batch']))
+            windows, day = [], start
+            while day <= end:
+                windows.append((day, min(end, day + step - datetime.timedelta(days=1))))
+                day += step
+
+        products = days = 0
+        for window_start, window_end in windows:
+            written = reporting.rebuild(window_start, window_end,
+                                        using=options['database'],
+                                        batch_size=options['batch_size'])
+            products += written[0]
+            days += written[1]
+            if window_start:
+                self.stdout.write(f'{window_start}..{window_end}: '
+                                  f'{written[0]} product rows, {written[1]} days')
+        self.stdout.write(self.style.SUCCESS(
+            f'Sales rollups rebuilt: {products} product rows, {days} days.'))
@@ -0,0 +1,60 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from commerce import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending outbox events to the OUTBOX_SINKS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true',
+                            help='drain the backlog and exit instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='seconds to wait when there is nothing to send')
+        parser.add_argument('--max-backoff', type=float, default=60.0,
+                            help='longest wait after consecutive failures')
+        parser.add_argument('--keep-days', type=float, default=7,
+                            help='delete dispatched events older than this '
+                                 'while idle (0 keeps them)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        sent = failures = 0
+        try:
+            while True:
+                try:
+                    count = outbox.dispatch_batch(batch_size=options['batch_size'],
+                                                  using=using)
+                except (outbox.SinkBusy, outbox.DeliveryFailed) as exc:
+                    failures += 1
+                    delay = min(options['max_backoff'], 2 ** (failures - 1))
+                    if isinstance(exc, outbox.SinkBusy) and exc.retry_after:
+                        delay = min(options['max_backoff'], exc.retry_after)
+                    self.stderr.write(f'Delivery failed ({exc}); retrying in {delay:g}s')
+                    if options['once'] and failures >= 5:
+                        break
+                    time.sleep(delay)
+                    continue
+                failures = 0
+                sent += count
+                if count:
+                    self.stdout.write(f'Sent {count} events')
+                if count == options['batch_size']:
+                    continue
+                if options['keep_days']:
+                    outbox.prune(timezone.now() - datetime.timedelta(
+                        days=options['keep_days']), using=using)
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'Dispatched {sent} events; {outbox.backlog(using)} pending.'))
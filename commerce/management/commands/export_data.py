@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from commerce import exports
+from commerce.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Stream orders or products to CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=['orders', 'products'])
+        parser.add_argument('--format', dest='export_format', default='csv',
+                            choices=sorted(exports.EXPORT_FORMATS))
+        parser.add_argument('--output', '-o',
+                            help='File to write to (default: stdout)')
+        parser.add_argument('--created-after',
+                            help='Orders only: ISO 8601 lower bound (inclusive)')
+        parser.add_argument('--created-before',
+                            help='Orders only: ISO 8601 upper bound (exclusive)')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['model'] == 'products':
+            content = exports.product_export(
+                Product.objects.order_by('pk'), options['export_format'],
+                options['chunk_size'])
+        else:
+            try:
+                queryset = exports.orders_created_between(
+                    options['created_after'], options['created_before'])
+            except ValueError as exc:
+                raise CommandError(exc)
+            content = exports.order_export(queryset, options['export_format'],
+                                           options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(content)
+        else:
+            for line in content:
+                self.stdout.write(line, ending='')
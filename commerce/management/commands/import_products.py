@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from commerce import imports
+
+
+class Command(BaseCommand):
+    help = 'Create or update products from a CSV keyed by sku'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--user', required=True,
+                            help='username recorded as created_by of new products')
+        parser.add_argument('--chunk-size', type=int, default=imports.CHUNK_SIZE)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        try:
+            user = get_user_model()._default_manager.db_manager(using) \
+                .get_by_natural_key(options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user named {options["user"]!r}')
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as file:
+                result = imports.import_products(file, user, options['chunk_size'],
+                                                 using=using)
+        except (OSError, imports.InvalidFile) as exc:
+            raise CommandError(exc)
+
+        for error in result.errors:
+            self.stderr.write(f'Line {error["line"]}: ' + '; '.join(
+                f'{column}: {" ".join(messages)}'
+                for column, messages in error['errors'].items()))
+        if result.failed > len(result.errors):
+            self.stderr.write(f'... and {result.failed - len(result.errors)} more')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created}, updated {result.updated}, '
+            f'unchanged {result.unchanged}, failed {result.failed}.'))
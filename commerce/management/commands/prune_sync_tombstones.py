@@ -0,0 +1,21 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from commerce import sync
+
+
+class Command(BaseCommand):
+    help = ('Delete catalog tombstones older than --days; clients that last '
+            'synced before them must sync again from scratch')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=90)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        deleted = sync.prune_tombstones(before, using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from commerce import cache, search
+from commerce.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        search.rebuild_index(connection)
+        cache.invalidate(Product)
+        self.stdout.write(self.style.SUCCESS(
+            f'Search index rebuilt on {connection.vendor}.'))
@@ -1,17 +1,39 @@
 import random
 from decimal import Decimal
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
 from faker import Faker
-from commerce.models import Category, Product, Order  # Replace 'shop' with your app name
+from commerce.models import Category, Product, Order, OrderItem  # Replace 'shop' with your app name
+from commerce.seeding import BulkSeeder
+from commerce.signals import orders_placed
 
 User = get_user_model()
 
 class Command(BaseCommand):
     help = 'Seed the database with sample data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--bulk', action='store_true',
+                            help='Generate a large synthetic dataset for load testing')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--max-lines', type=int, default=5,
+                            help='Maximum products per order')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread order dates over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='RNG seed; equal arguments give equal datasets')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Processes for Faker text generation')
+
     def handle(self, *args, **kwargs):
+        if kwargs.get('bulk'):
+            return self.handle_bulk(**kwargs)
+
         fake = Faker()
 
         # Predefined category names
@@ -61,13 +83,37 @@ class Command(BaseCommand):
         for i in range(20):
             user = random.choice(users)
             selected_products = random.sample(products, k=random.randint(1, 5))
-            total_price = sum([product.price for product in selected_products])
+            quantities = [random.randint(1, 3) for _ in selected_products]
+            total_price = sum(product.price * quantity
+                              for product, quantity in zip(selected_products, quantities))
 
             order = Order.objects.create(
                 user=user,
                 total_price=total_price
             )
-            order.products.set(selected_products)
+            items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=quantity,
+                          unit_price=product.price)
+                for product, quantity in zip(selected_products, quantities)
+            ])
+            orders_placed.send(sender=Order, orders=[order], items=items,
+                               using=order._state.db)
             self.stdout.write(self.style.SUCCESS(f'Order created for user {user.username} with total price {total_price}'))
 
         self.stdout.write(self.style.SUCCESS('Seeding completed successfully!'))
+
+    def handle_bulk(self, **options):
+        seeder = BulkSeeder(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            days=options['days'],
+            max_lines=options['max_lines'],
+            report=self.stdout.write,
+        )
+        try:
+            seeder.run(users=options['users'], categories=options['categories'],
+                       products=options['products'], orders=options['orders'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS('Bulk seeding completed successfully!'))
@@ -0,0 +1,152 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+Values live in this process only: with several workers each one reports its
+own series, so scrape every worker (or aggregate them in Prometheus) rather
+than a load balancer that picks one at random.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = defaultdict(int)
+
+    def inc(self, labels=(), amount=1):
+        self.values[tuple(labels)] += amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_labels(self.label_names, labels)} {_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values = {}
+
+    def observe(self, value, labels=()):
+        labels = tuple(labels)
+        row = self.values.get(labels)
+        if row is None:
+            row = self.values[labels] = [0] * (len(self.buckets) + 1) + [0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def samples(self):
+        for labels, row in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), row):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield (f'{self.name}_bucket'
+                       f'{_labels(self.label_names, labels, le)} {cumulative}')
+            label_text = _labels(self.label_names, labels)
+            yield f'{self.name}_sum{label_text} {_number(row[-1])}'
+            yield f'{self.name}_count{label_text} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def clear(self):
+        with self.lock:
+            for metric in self.metrics:
+                metric.values.clear()
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+ROUTE_LABELS = ('route', 'method')
+
+request_duration = registry.add(Histogram(
+    'ecomm_request_duration_seconds', 'Time spent handling the request.',
+    ROUTE_LABELS))
+request_db_duration = registry.add(Histogram(
+    'ecomm_request_db_seconds', 'Time spent in SQL queries per request.',
+    ROUTE_LABELS))
+request_render_duration = registry.add(Histogram(
+    'ecomm_request_render_seconds',
+    'Time spent serializing and rendering the response body.',
+    ROUTE_LABELS))
+request_queries = registry.add(Histogram(
+    'ecomm_request_queries', 'SQL queries per request.',
+    ROUTE_LABELS, QUERY_BUCKETS))
+response_size = registry.add(Histogram(
+    'ecomm_response_size_bytes', 'Response body size (streaming bodies excluded).',
+    ROUTE_LABELS, SIZE_BUCKETS))
+responses = registry.add(Counter(
+    'ecomm_responses_total', 'Responses by route and status code.',
+    ROUTE_LABELS + ('status',)))
+slow_requests = registry.add(Counter(
+    'ecomm_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS.',
+    ROUTE_LABELS))
+duplicate_query_requests = registry.add(Counter(
+    'ecomm_duplicate_query_requests_total',
+    'Requests that repeated one SQL statement DUPLICATE_QUERY_THRESHOLD times '
+    'or more (likely N+1).',
+    ROUTE_LABELS))
+
+
+def record(route, method, status, duration, queries, db_time, render_time,
+           size, slow, duplicates):
+    labels = (route, method)
+    with registry.lock:
+        request_duration.observe(duration, labels)
+        request_db_duration.observe(db_time, labels)
+        request_render_duration.observe(render_time, labels)
+        request_queries.observe(queries, labels)
+        if size is not None:
+            response_size.observe(size, labels)
+        responses.inc(labels + (str(status),))
+        if slow:
+            slow_requests.inc(labels)
+        if duplicates:
+            duplicate_query_requests.inc(labels)
@@ -0,0 +1,224 @@
+"""
+Per-request query and timing instrumentation.
+
+``RequestMetricsMiddleware`` counts SQL queries and their time through a
+database execute wrapper, times building the response body, and reports
+every request three ways:
+
+* a ``Server-Timing`` header (``db``, ``render`` and ``total``), readable in
+  the browser's network panel;
+* one line on the ``ecommerce`` logger, WARNING when the request is slow or
+  repeats one statement often enough to look like an N+1;
+* the histograms in ``commerce.metrics``, served at ``/api/metrics/``.
+
+``render`` covers both halves of the body: the view turning objects into
+data (``serializer.data`` in the views, timed by ``serializing()`` blocks such
+as those of ``SerializationTimingMixin``) and DRF encoding that data once the view returns. Queries
+run while serializing count in ``db`` as well.
+
+Configured by the ``REQUEST_METRICS`` setting; see ``DEFAULTS``.
+"""
+import contextvars
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.response import Response
+
+from . import metrics
+
+logger = logging.getLogger('ecommerce')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    # Requests slower than this are logged at WARNING and counted.
+    'SLOW_REQUEST_MS': 500,
+    # The same SQL (parameters aside) run this many times in one request is
+    # reported as a likely N+1.
+    'DUPLICATE_QUERY_THRESHOLD': 10,
+}
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.serializing = False
+        self.statements = Counter()
+
+    def duplicates(self, threshold):
+        return [(sql, count) for sql, count in self.statements.most_common(3)
+                if count >= threshold]
+
+
+@contextmanager
+def serializing():
+    """Count the block as render time of the current request, nested ones once."""
+    current = _current.get()
+    if current is None or current.serializing:
+        yield
+        return
+    current.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.serializing = False
+        current.render_time += time.perf_counter() - started
+
+
+class SerializationTimingMixin:
+    """
+    DRF's ``list`` and ``retrieve``, with ``serializer.data`` timed by
+    ``serializing()``.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(queryset if page is None else page, many=True)
+        with serializing():
+            data = serializer.data
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        with serializing():
+            data = serializer.data
+        return Response(data)
+
+
+def record_query(execute, sql, params, many, context):
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.db_time += time.perf_counter() - started
+        current.queries += 1
+        current.statements[sql] += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    # The wrapper stays installed and is a no-op outside a request, so it
+    # also sees queries from the threads async views hand the ORM to.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_recorder,
+                                   dispatch_uid='commerce.request_metrics')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+        current, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, current, config)
+        return response
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+        current, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, current, config)
+        return response
+
+    def start(self):
+        for connection in connections.all():
+            install_query_recorder(connection)
+        current = RequestMetrics()
+        return current, _current.set(current)
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time that step.
+        current = _current.get()
+        if current is not None and not response.is_rendered:
+            started = time.perf_counter()
+
+            def rendered(response):
+                current.render_time += time.perf_counter() - started
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, current, config):
+        duration = time.perf_counter() - current.started
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        slow = duration * 1000 >= config['SLOW_REQUEST_MS']
+        duplicates = current.duplicates(config['DUPLICATE_QUERY_THRESHOLD'])
+
+        metrics.record(route, request.method, response.status_code, duration,
+                       current.queries, current.db_time, current.render_time,
+                       size, slow, bool(duplicates))
+
+        if config['SERVER_TIMING']:
+            timing = (f'db;dur={current.db_time * 1000:.2f};'
+                      f'desc="{current.queries} queries", '
+                      f'render;dur={current.render_time * 1000:.2f}, '
+                      f'total;dur={duration * 1000:.2f}')
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': current.queries,
+            'db_ms': round(current.db_time * 1000, 2),
+            'render_ms': round(current.render_time * 1000, 2),
+            'bytes': size,
+        }
+        if slow or duplicates:
+            fields['slow'] = slow
+            if duplicates:
+                sql, count = duplicates[0]
+                fields['duplicate_query_count'] = count
+                fields['duplicate_query'] = sql[:200]
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        logger.log(level, 'request %s', ' '.join(
+            f'{key}={value!r}' if isinstance(value, str) and (' ' in value or not value)
+            else f'{key}={value}'
+            for key, value in fields.items()), extra={'request_metrics': fields})
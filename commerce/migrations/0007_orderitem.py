@@ -0,0 +1,84 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def snapshot_legacy_prices(apps, schema_editor):
+    # Historical lines predate the snapshot; the current price is the best
+    # record available for them.
+    OrderItem = apps.get_model("commerce", "OrderItem")
+    Product = apps.get_model("commerce", "Product")
+    OrderItem.objects.filter(unit_price__isnull=True).update(
+        unit_price=Subquery(
+            Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("commerce", "0006_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        # Promote the auto-created Order.products table to an explicit
+        # through model without touching the existing rows.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="OrderItem",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "order",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="items",
+                                to="commerce.order",
+                            ),
+                        ),
+                        (
+                            "product",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="commerce.product",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "commerce_order_products",
+                        "unique_together": {("order", "product")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="order",
+                    name="products",
+                    field=models.ManyToManyField(
+                        through="commerce.OrderItem", to="commerce.product"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="quantity",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.RunPython(snapshot_legacy_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.17 on 2026-10-18 18:38
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_category_stats(apps, schema_editor):
+    Category = apps.get_model('commerce', 'Category')
+    Product = apps.get_model('commerce', 'Product')
+    using = schema_editor.connection.alias
+
+    def aggregate(expression, **kwargs):
+        return Subquery(
+            Product.objects.using(using).filter(category=OuterRef('pk'))
+            .order_by().values('category').annotate(value=expression).values('value'),
+            **kwargs)
+
+    Category.objects.using(using).update(
+        product_count=Coalesce(aggregate(Count('pk'), output_field=IntegerField()),
+                               Value(0)),
+        min_price=aggregate(Min('price')),
+        max_price=aggregate(Max('price')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0009_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_category_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.17 on 2026-10-18 18:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def fill_summaries(apps, schema_editor):
+    Order = apps.get_model('commerce', 'Order')
+    CustomerOrderSummary = apps.get_model('commerce', 'CustomerOrderSummary')
+    using = schema_editor.connection.alias
+    rows = Order.objects.using(using).order_by().values('user_id').annotate(
+        order_count=Count('id'), total_spent=Sum('total_price'))
+    CustomerOrderSummary.objects.using(using).bulk_create(
+        [CustomerOrderSummary(**row) for row in rows], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('commerce', '0011_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerOrderSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_user_created_at_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='order_user_recent_idx'),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
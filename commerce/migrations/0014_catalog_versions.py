@@ -0,0 +1,67 @@
+# Generated by Django 4.2.17 on 2026-10-18 18:52
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def stamp_existing_rows(apps, schema_editor):
+    # Distinct versions for every existing row, then start the counter
+    # after them.
+    using = schema_editor.connection.alias
+    offset = 0
+    for name in ('Category', 'Product'):
+        model = apps.get_model('commerce', name)
+        rows = model.objects.using(using)
+        rows.update(version=F('pk') + offset)
+        offset += rows.aggregate(Max('pk'))['pk__max'] or 0
+    apps.get_model('commerce', 'CatalogVersion').objects.using(using).create(
+        pk=1, value=offset)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0013_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('pruned_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('version', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(stamp_existing_rows, migrations.RunPython.noop),
+    ]
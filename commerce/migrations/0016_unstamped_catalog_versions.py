@@ -0,0 +1,28 @@
+# Generated by Django 4.2.17 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0015_product_sku'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='version',
+            field=models.BigIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='version',
+            field=models.BigIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='tombstone',
+            name='version',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+    ]
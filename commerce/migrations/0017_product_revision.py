@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0016_unstamped_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,34 +1,236 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
-class Category(models.Model):
+class CatalogVersion(models.Model):
+    """
+    The single-row counter behind ``VersionedModel.version``; see
+    ``commerce.sync``. ``pruned_through`` is the newest tombstone version
+    deleted by ``sync.prune_tombstones()``.
+    """
+    value = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(default=0)
+
+    @classmethod
+    def reserve(cls, count=1, using='default'):
+        """
+        Take ``count`` consecutive versions and return the first. The counter
+        row stays locked until the transaction commits, so only the short
+        stamping transactions of ``commerce.sync`` call this.
+        """
+        with transaction.atomic(using, savepoint=False):
+            counters = cls.objects.using(using).filter(pk=1)
+            if not counters.update(value=F('value') + count):
+                cls.objects.using(using).create(pk=1, value=count)
+                return 1
+            return counters.values_list('value', flat=True).get() - count + 1
+
+
+class VersionedModel(models.Model):
+    """
+    Rows versioned for the ``/api/sync/`` change feed. Every write clears
+    ``version`` (``NULL`` means changed but not yet stamped) and
+    ``commerce.sync`` stamps the row after the write commits. Writes that
+    bypass ``save()`` set ``version=None`` themselves.
+    """
+    version = models.BigIntegerField(null=True, editable=False, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'updated_at'}
+        self.version = None
+        super().save(*args, **kwargs)
+
+
+class Category(VersionedModel):
     name = models.CharField(max_length=255)
+    # Maintained by commerce.category_stats; not editable through the API.
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True,
+                                    blank=True, editable=False)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True,
+                                    blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Exact name lookups (imports, admin); the icontains search in
+            # CategoryViewSet cannot use a b-tree index.
+            models.Index(fields=['name'], name='category_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Product(models.Model):
+class Product(VersionedModel):
+    # Merchant stock-keeping unit, the key of CSV imports (commerce.imports).
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField()
     image = models.ImageField(upload_to='products/', null=True, blank=True)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    # {variant: {format: storage name}}, written by commerce.images.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Indexed by product_category_price_idx, which leads with category_id.
+    category = models.ForeignKey(Category, on_delete=models.CASCADE,
+                                 db_index=False)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
-    #
+    # Sequence of the product's outbox events, bumped in the database by
+    # commerce.outbox and never written back by save().
+    revision = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination over the ProductViewSet ordering fields.
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['stock', 'id'], name='product_stock_id_idx'),
+            # Category pages sorted by price; also serves category_id lookups.
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and \
+                kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'revision']
+        super().save(*args, **kwargs)
+
 
 class Order(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    products = models.ManyToManyField(Product)
+    # Indexed by order_user_recent_idx, which leads with user_id.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    products = models.ManyToManyField(Product, through='OrderItem')
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination over the OrderViewSet ordering fields.
+            models.Index(fields=['total_price', 'id'], name='order_total_price_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='order_created_at_id_idx'),
+            # A user's orders newest first, in the (-created_at, -id) keyset
+            # order of OrderViewSet.mine; also serves user_id lookups.
+            models.Index(fields=['user', '-created_at', '-id'],
+                         name='order_user_recent_idx'),
+        ]
+
     def __str__(self):
         return f'Order #{self.id}'
+
+
+class OrderItem(models.Model):
+    # Takes over the auto-created Order.products table, keeping its
+    # DEFAULT_AUTO_FIELD (BigAutoField) key.
+    order = models.ForeignKey(Order, on_delete=models.CASCADE,
+                              related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    # Price per unit when the order was placed; null only for legacy rows
+    # added through ``Order.products`` without ``through_defaults``.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2,
+                                     null=True, blank=True)
+
+    class Meta:
+        db_table = 'commerce_order_products'
+        unique_together = [('order', 'product')]
+
+    def __str__(self):
+        return f'{self.quantity} x {self.product_id} (order #{self.order_id})'
+
+
+class ProductSalesRollup(models.Model):
+    """
+    Units and revenue per day, category and product, maintained by
+    ``commerce.reporting``. ``orders`` counts the orders containing the
+    product that day.
+    """
+    day = models.DateField()
+    # Indexed by product_sales_category_day_idx, which leads with category_id.
+    category = models.ForeignKey(Category, on_delete=models.CASCADE,
+                                 db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # Conflict target of the incremental upsert; also serves the
+            # date-range scans of every report.
+            models.UniqueConstraint(fields=['day', 'category', 'product'],
+                                    name='product_sales_rollup_key'),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'day'],
+                         name='product_sales_category_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} product {self.product_id}: {self.quantity}'
+
+
+class DailySalesRollup(models.Model):
+    """Orders, units and revenue per day, maintained by ``commerce.reporting``."""
+    day = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.day}: {self.orders} orders'
+
+
+class CustomerOrderSummary(models.Model):
+    """A user's order count and spend, maintained by ``commerce.customers``."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='order_summary')
+    order_count = models.IntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.order_count} orders'
+
+
+class OutboxEvent(models.Model):
+    """A change for downstream consumers, written by ``commerce.outbox``."""
+    topic = models.CharField(max_length=64)
+    key = models.CharField(max_length=64)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The dispatcher's scan; dispatched rows drop out of the index.
+            models.Index(fields=['id'], condition=models.Q(dispatched_at__isnull=True),
+                         name='outbox_pending_idx'),
+            models.Index(fields=['dispatched_at'], name='outbox_dispatched_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.topic} {self.key}'
+
+
+class Tombstone(models.Model):
+    """A deleted versioned row, reported by the sync feed until pruned."""
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    version = models.BigIntegerField(null=True, unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} deleted at version {self.version}'
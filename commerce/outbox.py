@@ -0,0 +1,283 @@
+"""
+Transactional outbox for downstream consumers.
+
+Changes are recorded as ``OutboxEvent`` rows in the same transaction as the
+change itself (see the receivers in ``commerce.signals``): ``order.created``
+for every placed order and ``order.changed`` when one's user, total or lines
+are edited, ``product.created`` and ``product.changed`` when a product is
+added or its price or stock changes, including the stock orders take or put
+back. So an event exists if and only if its change committed.
+
+``manage.py dispatch_outbox`` drains pending events in id order, in batches,
+to every sink in ``OUTBOX_SINKS``, and only then marks them dispatched.
+Delivery is at least once: a batch that fails on any sink (or a dispatcher
+that dies mid-batch) is sent again, to every sink, so consumers must
+de-duplicate on the event ``id``. A failing or busy sink stops the drain
+until it recovers, with exponential backoff (or the sink's
+``SinkBusy.retry_after``), so a slow consumer is never sent more than one
+batch at a time.
+
+Delivery order is not commit order, not even per key: ids are assigned at
+insert, before commit, so a transaction can commit an event below ids
+already sent, and concurrent dispatchers send disjoint batches side by
+side. Product events carry absolute price and stock plus the product's
+``revision``, which rises in commit order (see ``product_events()``), so a
+consumer applies an event only if its revision is above the last one it
+applied for that product.
+"""
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent, Product
+
+ORDER_CREATED = 'order.created'
+ORDER_CHANGED = 'order.changed'
+PRODUCT_CREATED = 'product.created'
+PRODUCT_CHANGED = 'product.changed'
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class SinkBusy(Exception):
+    """Raised by a sink that wants no more events for ``retry_after`` seconds."""
+
+    def __init__(self, retry_after=None, message='Sink is busy'):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class DeliveryFailed(Exception):
+    def __init__(self, sink, error):
+        self.sink = sink
+        self.error = error
+        super().__init__(f'{sink}: {error}')
+
+
+def serialize_event(event):
+    return {'id': event.pk, 'topic': event.topic, 'key': event.key,
+            'created_at': event.created_at, 'payload': event.payload}
+
+
+def encode_events(events):
+    return [json.dumps(serialize_event(event), cls=DjangoJSONEncoder,
+                       separators=(',', ':')) for event in events]
+
+
+class FileSink:
+    """Appends events as JSON lines, flushed to disk before returning."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return f'file {self.path}'
+
+    def send(self, events):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as output:
+            output.write(''.join(line + '\n' for line in encode_events(events)))
+            output.flush()
+            os.fsync(output.fileno())
+
+
+class WebhookSink:
+    """
+    POSTs each batch as ``{"events": [...]}``. Any 2xx is success; 429 and
+    503 are backpressure (``Retry-After`` is honoured); anything else fails.
+    """
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def __str__(self):
+        return f'webhook {self.url}'
+
+    def send(self, events):
+        body = '{"events":[%s]}' % ','.join(encode_events(events))
+        request = urllib.request.Request(
+            self.url, data=body.encode(), method='POST',
+            headers={'Content-Type': 'application/json', **self.headers})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except urllib.error.HTTPError as exc:
+            if exc.code in (429, 503):
+                retry_after = exc.headers.get('Retry-After')
+                raise SinkBusy(float(retry_after) if retry_after and
+                               retry_after.isdigit() else None,
+                               f'HTTP {exc.code}')
+            raise
+
+
+_sinks = None
+_lock = threading.Lock()
+
+
+def get_sinks():
+    """Sinks built from ``OUTBOX_SINKS`` (``{name: {BACKEND, OPTIONS}}``)."""
+    global _sinks
+    with _lock:
+        if _sinks is None:
+            _sinks = [import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+                      for config in getattr(settings, 'OUTBOX_SINKS', {}).values()]
+        return _sinks
+
+
+def reset_sinks():
+    global _sinks
+    with _lock:
+        _sinks = None
+
+
+def publish(events, using='default'):
+    """Write ``[(topic, key, payload)]`` in the caller's transaction."""
+    rows = [OutboxEvent(topic=topic, key=str(key), payload=payload)
+            for topic, key, payload in events]
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        OutboxEvent.objects.using(using).bulk_create(rows)
+        return
+    # bulk_create splits SQLite INSERTs at 999 parameters, a few hundred
+    # events; a bulk order's events go in as one executemany instead.
+    fields = [field for field in OutboxEvent._meta.concrete_fields
+              if not field.primary_key]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(OutboxEvent._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)))
+    params = [[field.get_db_prep_save(field.pre_save(row, True), connection)
+               for field in fields] for row in rows]
+    if params:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+
+def product_payload(product):
+    return {'id': product.pk, 'price': product.price, 'stock': product.stock,
+            'revision': product.revision}
+
+
+def _bump_revisions(product_ids, using):
+    # An UPDATE in the writer's transaction: it waits for any other writer of
+    # the row to finish, so revisions rise in commit order.
+    Product.objects.using(using).filter(pk__in=product_ids) \
+        .update(revision=F('revision') + 1)
+
+
+def product_events(changes, using='default'):
+    """
+    ``[(topic, product)]`` as events, each product at its next revision,
+    which is also set on the instance.
+    """
+    if not changes:
+        return []
+    product_ids = {product.pk for _, product in changes}
+    _bump_revisions(product_ids, using)
+    revisions = dict(Product.objects.using(using).filter(pk__in=product_ids)
+                     .values_list('pk', 'revision'))
+    events = []
+    for topic, product in changes:
+        product.revision = revisions[product.pk]
+        events.append((topic, product.pk, product_payload(product)))
+    return events
+
+
+def order_events(orders, items, using='default', topic=ORDER_CREATED,
+                 product_ids=None):
+    """
+    ``topic`` per order, and ``product.changed`` for the stock it moved: that
+    of ``product_ids``, by default every product in ``items``.
+    """
+    lines = {}
+    for item in items:
+        lines.setdefault(item.order_id, []).append(
+            {'product': item.product_id, 'quantity': item.quantity,
+             'unit_price': item.unit_price})
+    events = [(topic, order.pk, {
+        'id': order.pk, 'user': order.user_id, 'total_price': order.total_price,
+        'created_at': order.created_at, 'items': lines.get(order.pk, []),
+    }) for order in orders]
+    # Stock was reserved with conditional UPDATEs; read the resulting levels
+    # back inside the same transaction.
+    if product_ids is None:
+        product_ids = {item.product_id for item in items}
+    _bump_revisions(product_ids, using)
+    products = Product.objects.using(using).only('price', 'stock', 'revision') \
+        .filter(pk__in=product_ids).order_by('pk')
+    events += [(PRODUCT_CHANGED, product.pk, product_payload(product))
+               for product in products]
+    return events
+
+
+def _pending(using):
+    queryset = OutboxEvent.objects.using(using).filter(dispatched_at__isnull=True) \
+        .order_by('pk')
+    if connections[using].features.has_select_for_update_skip_locked:
+        # Concurrent dispatchers take disjoint batches, which consumers may
+        # see interleaved.
+        queryset = queryset.select_for_update(skip_locked=True)
+    return queryset
+
+
+def dispatch_batch(sinks=None, batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """
+    Send up to ``batch_size`` pending events to every sink and mark them
+    dispatched. Returns the number sent; raises ``SinkBusy`` or
+    ``DeliveryFailed`` after recording the attempt on the events.
+    """
+    sinks = get_sinks() if sinks is None else sinks
+    if connections[using].features.has_select_for_update_skip_locked:
+        claim = transaction.atomic(using)
+    else:
+        # Without row locks (SQLite) a read transaction held across the
+        # sends would block order writes; the claim is then a plain read.
+        claim = transaction.mark_for_rollback_on_error(using)
+    with claim:
+        events = list(_pending(using)[:batch_size])
+        if not events:
+            return 0
+        ids = [event.pk for event in events]
+        failure = None
+        for sink in sinks:
+            try:
+                sink.send(events)
+            except SinkBusy as exc:
+                failure = exc
+                break
+            except Exception as exc:
+                failure = DeliveryFailed(sink, exc)
+                break
+        pending = OutboxEvent.objects.using(using).filter(pk__in=ids)
+        if failure is None:
+            pending.update(dispatched_at=timezone.now())
+        else:
+            pending.update(attempts=F('attempts') + 1, last_error=str(failure)[:1000])
+    if failure is not None:
+        raise failure
+    return len(events)
+
+
+def backlog(using='default'):
+    return OutboxEvent.objects.using(using).filter(dispatched_at__isnull=True).count()
+
+
+def prune(older_than, using='default'):
+    """Delete events dispatched before ``older_than``; returns how many."""
+    deleted, _ = OutboxEvent.objects.using(using) \
+        .filter(dispatched_at__lt=older_than).delete()
+    return deleted
@@ -0,0 +1,174 @@
+import datetime
+import decimal
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from django.db.models import Q
+from django.db.models.query import ValuesIterable
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['position', 'reverse'])
+
+
+def _encode_value(value):
+    # Positions must round-trip exactly: keep full microsecond precision
+    # (DjangoJSONEncoder truncates to milliseconds) and exact decimals.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination keyed on ``(ordering fields..., pk)``.
+
+    Unlike DRF's ``CursorPagination`` the ordering is not fixed: it is taken
+    from the queryset as left by the filter backends (``OrderingFilter``,
+    search ranking), falling back to ``view.ordering`` and then ``pk``. The
+    primary key is always appended as a tie-breaker, so every position is
+    unique and a page is a single index range scan with no OFFSET, whatever
+    its depth.
+
+    ``values(*fields)`` querysets are accepted too; the key columns are added to the
+    selection so cursors can be built from the row dicts.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('pk',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the unevaluated queryset for the requested page, or ``None``
+        when pagination is disabled. Pass its results to ``set_page()``.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        queryset = queryset.order_by(*(
+            name if descending == reverse else '-' + name
+            for name, descending in self.keys
+        ))
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(self.cursor.position, reverse))
+        if issubclass(queryset._iterable_class, ValuesIterable) and queryset._fields:
+            missing = [name for name, _ in self.keys if name not in queryset._fields]
+            if missing:
+                queryset = queryset.values(*queryset._fields, *missing)
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.page = list(results[:self.page_size])
+        has_more = len(results) > self.page_size
+
+        if self.cursor is not None and self.cursor.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = (
+            queryset.query.order_by
+            or queryset.model._meta.ordering
+            or getattr(view, 'ordering', None)
+            or self.ordering
+        )
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+
+        keys = []
+        for field in ordering:
+            assert isinstance(field, str), (
+                'KeysetPagination only supports ordering by field names, '
+                'got %r.' % (field,)
+            )
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            if name in ('pk', queryset.model._meta.pk.name):
+                keys.append(('pk', descending))
+                break
+            keys.append((name, descending))
+        else:
+            keys.append(('pk', keys[0][1] if keys else False))
+
+        self.keys = keys
+        return tuple(('-' if descending else '') + name for name, descending in keys)
+
+    def _after(self, position, reverse):
+        # Lexicographic "row comes after position":
+        #   (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != reverse else 'gt'
+            term = Q(**{f'{name}__{lookup}': position[index]})
+            for prior_index, (prior, _) in enumerate(self.keys[:index]):
+                term &= Q(**{prior: position[prior_index]})
+            condition |= term
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return [instance[name] for name, _ in self.keys]
+        return [getattr(instance, name) for name, _ in self.keys]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(position=position, reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(position=position, reverse=True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position = tokens['p']
+            reverse = bool(tokens.get('r', False))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.keys):
+            # The cursor was issued for a different ordering.
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(position=position, reverse=reverse)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = 1
+        payload = json.dumps(tokens, default=_encode_value, separators=(',', ':'))
+        encoded = urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
@@ -0,0 +1,94 @@
+"""
+JSON renderer and parser backed by ``orjson`` when it is installed.
+
+The output matches ``rest_framework.renderers.JSONRenderer`` byte for byte:
+compact separators, UTF-8 rather than ``\\u`` escapes, U+2028/U+2029
+escaped, and ``Decimal``/``datetime``/lazy strings encoded by DRF's own
+``JSONEncoder.default`` (millisecond datetimes, ``Z`` for UTC). Requests for
+indented output, non-default JSON settings, or a missing ``orjson`` fall back
+to the DRF classes, which remain the pure-Python implementation.
+
+Known differences, all at the edges of the number range: rendered floats
+spell exponents ``1e16`` rather than ``1e+16`` and turn NaN/infinity into
+``null`` where DRF's strict mode raises (the serializers here render prices
+as decimal strings, not floats), and parsed integers beyond 64 bits become
+floats, which the integer and primary-key fields reject either way.
+"""
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders, json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised without orjson installed
+    orjson = None
+
+# orjson handles str/int/float/bool/None, dict/list/tuple (and subclasses such
+# as ReturnDict and ErrorDetail) natively; everything else, including the
+# datetime types it would otherwise format itself, goes through DRF's encoder.
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+                  if orjson is not None else 0)
+
+
+def orjson_enabled():
+    return orjson is not None and getattr(settings, 'USE_ORJSON', True)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not orjson_enabled() or not (
+                self.compact and not self.ensure_ascii and self.strict
+                and self.encoder_class is encoders.JSONEncoder) or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=encoders.JSONEncoder().default,
+                               option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, among others.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as DRF: both are valid JSON but not valid JavaScript.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class JSONParser(parsers.JSONParser):
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if not orjson_enabled() or encoding.lower().replace('_', '-') != 'utf-8' \
+                or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read() if stream is not None else b''
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+        # Let json decide on anything orjson rejects, so accepted input and
+        # error messages stay the same as DRF's parser.
+        try:
+            return json.loads(body.decode(encoding),
+                              parse_constant=json.strict_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class PrometheusTextRenderer(renderers.BaseRenderer):
+    """Prometheus exposition format; errors render as their detail text."""
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
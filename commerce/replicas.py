@@ -0,0 +1,112 @@
+"""
+Read replicas for the catalog.
+
+``ReplicaRouter`` (in ``DATABASE_ROUTERS``) sends reads to one of the
+``DATABASE_REPLICAS`` aliases only inside a ``replica_reads()`` scope, and
+only for the models the scope names. ``ReplicaReadMixin`` opens that scope
+for the safe-method requests of the catalog viewsets, one replica per
+request. Everything else reads from the primary, so order placement, auth
+and the admin never see replication lag.
+
+Read-your-writes within a request: the first write routed through the
+router pins the rest of the scope to the primary, as does an open
+transaction on it. Across requests, catalog responses can trail a commit by
+the replicas' lag. A response built from a replica may predate the write
+whose invalidation it follows, so the response cache keeps it for only
+``REPLICA_CACHE_TIMEOUT`` seconds (0: not at all) rather than
+``CATALOG_CACHE_TIMEOUT``; see ``reading_from_replica()``.
+
+With no ``DATABASE_REPLICAS`` the router routes nothing.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaScope:
+    def __init__(self, alias, models):
+        self.alias = alias
+        self.models = models
+        self.pinned = False
+        # Whether any read was routed to the replica.
+        self.used = False
+
+
+_scope = contextvars.ContextVar('replica_scope', default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+@contextmanager
+def replica_reads(models):
+    """Read ``models`` from one replica until the block ends or something writes."""
+    replicas = get_replicas()
+    scope = ReplicaScope(random.choice(replicas), {model._meta.label_lower
+                                                   for model in models}) \
+        if replicas else None
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def reading_from_replica():
+    """Whether the current scope has read anything from its replica."""
+    scope = _scope.get()
+    return scope is not None and scope.used
+
+
+def _from_replica(hints):
+    instance = hints.get('instance')
+    return instance is not None and instance._state.db in get_replicas()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None and not scope.pinned \
+                and model._meta.label_lower in scope.models \
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            scope.used = True
+            return scope.alias
+        # Related lookups from a replica-loaded instance would otherwise
+        # follow it to the replica.
+        return DEFAULT_DB_ALIAS if _from_replica(hints) else None
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.pinned = True
+        # Saving a replica-loaded instance must not go to its replica.
+        return DEFAULT_DB_ALIAS if _from_replica(hints) else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's data.
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, *get_replicas()}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in get_replicas() else None
+
+
+class ReplicaReadMixin:
+    """Reads of ``replica_models`` (default: the queryset's) from a replica."""
+    replica_models = None
+
+    def get_replica_models(self):
+        return self.replica_models or [self.queryset.model]
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads(self.get_replica_models()):
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,209 @@
+"""
+Sales rollups: precomputed per-day aggregates for the reporting API.
+
+``ProductSalesRollup`` holds units, revenue and order counts per day,
+category and product; ``DailySalesRollup`` the same per day. Placing an
+order (the ``orders_placed`` signal) adds its lines to both with one
+``INSERT ... ON CONFLICT DO UPDATE`` per table, editing its lines
+(``order_updated``) adds the difference, and deleting an order subtracts
+them. The upserts run on commit, after the order transaction, so
+the hot per-day row is only locked briefly and a rolled-back order never
+counts.
+
+Days are local dates in ``TIME_ZONE``, and revenue is
+``quantity * unit_price`` of the order lines. A line is filed under the
+category its product had when the order was placed; ``rebuild()`` uses the
+current category. Changes that bypass the signal (raw SQL, admin edits of
+order lines, a crash between commit and the upsert) are repaired by
+``rebuild()``, i.e. ``manage.py backfill_sales_rollups``.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySalesRollup, Order, OrderItem, ProductSalesRollup
+
+PRODUCT_KEY = ('day', 'category_id', 'product_id')
+DAILY_KEY = ('day',)
+TOTALS = ('orders', 'quantity', 'revenue')
+REBUILD_BATCH_SIZE = 2000
+
+
+def local_day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def aggregate_items(items, sign=1):
+    """
+    Per-product and per-day totals of ``items`` (``OrderItem`` instances with
+    ``order`` and ``product`` loaded), as two ``{key: [orders, quantity,
+    revenue]}`` dicts. ``sign=-1`` gives the amounts to subtract.
+    """
+    product_orders, day_orders = defaultdict(set), defaultdict(set)
+    products = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    days = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    for item in items:
+        day = local_day(item.order.created_at)
+        revenue = (item.unit_price or 0) * item.quantity
+        for totals, orders, key in (
+                (products, product_orders, (day, item.product.category_id, item.product_id)),
+                (days, day_orders, (day,))):
+            orders[key].add(item.order_id)
+            totals[key][1] += sign * item.quantity
+            totals[key][2] += sign * revenue
+    for totals, orders in ((products, product_orders), (days, day_orders)):
+        for key, order_ids in orders.items():
+            totals[key][0] = sign * len(order_ids)
+    return products, days
+
+
+def upsert_totals(model, key_columns, totals, rows, using='default'):
+    """
+    Add ``{key: values}`` to the ``totals`` columns of ``model``'s rows,
+    inserting the ones that do not exist yet; keys are unique on
+    ``key_columns``.
+    """
+    if not rows:
+        return
+    connection = connections[using]
+    params = [key + tuple(values) for key, values in rows.items()]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        with transaction.atomic(using):
+            for row in params:
+                key = dict(zip(key_columns, row))
+                values = dict(zip(totals, row[len(key_columns):]))
+                updated = model.objects.using(using).filter(**key).update(
+                    **{name: F(name) + value for name, value in values.items()})
+                if not updated:
+                    model.objects.using(using).create(**key, **values)
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = key_columns + totals
+    sql = (
+        f'INSERT INTO {table} ({", ".join(map(quote, columns))}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({", ".join(map(quote, key_columns))}) DO UPDATE SET '
+        + ', '.join(f'{quote(name)} = {table}.{quote(name)} + excluded.{quote(name)}'
+                    for name in totals)
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def apply(products, days, using='default'):
+    with transaction.atomic(using):
+        upsert_totals(ProductSalesRollup, PRODUCT_KEY, TOTALS, products, using)
+        upsert_totals(DailySalesRollup, DAILY_KEY, TOTALS, days, using)
+
+
+def record_items(items, sign=1, using='default'):
+    """Add (or with ``sign=-1`` remove) ``items`` once the transaction commits."""
+    _record(*aggregate_items(items, sign), using)
+
+
+def record_replaced_items(previous, items, using='default'):
+    """Replace an edited order's ``previous`` lines with ``items``, likewise."""
+    merged = []
+    for removed, added in zip(aggregate_items(previous, -1), aggregate_items(items)):
+        totals = {}
+        for key in removed.keys() | added.keys():
+            values = [old + new for old, new in zip(removed[key], added[key])]
+            if any(values):
+                totals[key] = values
+        merged.append(totals)
+    _record(*merged, using)
+
+
+def _record(products, days, using):
+    if products or days:
+        # The order is committed by then: a failed upsert is logged rather
+        # than failing the request, and left for rebuild() to repair.
+        transaction.on_commit(lambda: apply(products, days, using), using=using,
+                              robust=True)
+
+
+def _between(queryset, field, start, end):
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lte': end})
+    return queryset
+
+
+def rebuild(start=None, end=None, using='default', batch_size=REBUILD_BATCH_SIZE):
+    """
+    Recompute the rollups for days ``start``..``end`` (inclusive; ``None``
+    leaves that side open) from the order lines. Returns the number of
+    product and daily rows written.
+    """
+    items = _between(OrderItem.objects.using(using), 'order__created_at__date',
+                     start, end).annotate(
+        day=TruncDate('order__created_at'),
+        line_total=F('quantity') * F('unit_price'),
+    )
+    totals = {
+        'total_quantity': Sum('quantity'),
+        'total_revenue': Sum('line_total', output_field=DecimalField(
+            max_digits=14, decimal_places=2)),
+    }
+    product_rows = items.values('day', 'product_id', 'product__category_id') \
+        .annotate(order_count=Count('order_id', distinct=True), **totals).order_by()
+    item_days = items.values('day').annotate(**totals).order_by()
+    order_days = _between(Order.objects.using(using), 'created_at__date', start, end) \
+        .annotate(day=TruncDate('created_at')).values('day') \
+        .annotate(order_count=Count('id')).order_by()
+
+    with transaction.atomic(using):
+        _between(ProductSalesRollup.objects.using(using), 'day', start, end).delete()
+        _between(DailySalesRollup.objects.using(using), 'day', start, end).delete()
+
+        written, batch = 0, []
+        for row in product_rows.iterator(chunk_size=batch_size):
+            batch.append(ProductSalesRollup(
+                day=row['day'], category_id=row['product__category_id'],
+                product_id=row['product_id'], orders=row['order_count'],
+                quantity=row['total_quantity'], revenue=row['total_revenue'] or 0))
+            if len(batch) >= batch_size:
+                ProductSalesRollup.objects.using(using).bulk_create(batch)
+                written, batch = written + len(batch), []
+        ProductSalesRollup.objects.using(using).bulk_create(batch)
+        written += len(batch)
+
+        orders = {row['day']: row['order_count'] for row in order_days}
+        daily = [DailySalesRollup(day=row['day'], orders=orders.get(row['day'], 0),
+                                  quantity=row['total_quantity'],
+                                  revenue=row['total_revenue'] or 0)
+                 for row in item_days]
+        DailySalesRollup.objects.using(using).bulk_create(daily, batch_size=batch_size)
+    return written, len(daily)
+
+
+def daily(start, end):
+    return _between(DailySalesRollup.objects.all(), 'day', start, end).order_by('day')
+
+
+def categories(start, end):
+    """Units and revenue per category, highest revenue first."""
+    return _between(ProductSalesRollup.objects.all(), 'day', start, end) \
+        .values('category_id').annotate(
+            name=F('category__name'),
+            total_quantity=Sum('quantity'),
+            total_revenue=Sum('revenue'),
+        ).order_by('-total_revenue', 'category_id')
+
+
+def top_products(start, end, by='revenue', limit=10):
+    """The ``limit`` best-selling products by ``revenue`` or ``quantity``."""
+    return _between(ProductSalesRollup.objects.all(), 'day', start, end) \
+        .values('product_id').annotate(
+            name=F('product__name'),
+            total_orders=Sum('orders'),
+            total_quantity=Sum('quantity'),
+            total_revenue=Sum('revenue'),
+        ).order_by(f'-total_{by}', 'product_id')[:limit]
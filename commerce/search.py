@@ -0,0 +1,152 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+FTS_TABLE = 'commerce_product_fts'
+TS_CONFIG = 'english'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(terms):
+    return [token for term in terms for token in _TOKEN_RE.findall(term)]
+
+
+def fts_match_expression(terms):
+    """FTS5 MATCH expression requiring every token as a prefix match."""
+    return ' '.join('"%s"*' % token for token in _tokens(terms))
+
+
+def tsquery_expression(terms):
+    """to_tsquery() input requiring every token as a prefix match."""
+    return ' & '.join('%s:*' % token for token in _tokens(terms))
+
+
+def create_index(connection):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"name, description, tokenize='unicode61 remove_diacritics 2', "
+                f"prefix='2 3')"
+            )
+        rebuild_index(connection)
+    elif connection.vendor == 'postgresql':
+        # A stored generated column keeps itself in sync on every write path
+        # (including bulk and raw updates), so Postgres needs no signal hooks.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ALTER TABLE commerce_product ADD COLUMN IF NOT EXISTS "
+                "search_vector tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{TS_CONFIG}', coalesce(name, '')), 'A') || "
+                f"setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'B')"
+                ") STORED"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS commerce_product_search_gin "
+                "ON commerce_product USING GIN (search_vector)"
+            )
+
+
+def drop_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS commerce_product_search_gin')
+            cursor.execute(
+                'ALTER TABLE commerce_product DROP COLUMN IF EXISTS search_vector'
+            )
+
+
+def rebuild_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+                f'SELECT id, name, description FROM commerce_product'
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        elif connection.vendor == 'postgresql':
+            cursor.execute('REINDEX INDEX commerce_product_search_gin')
+
+
+def index_products(products, using='default'):
+    """Write the given products' current text into the SQLite FTS table."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not products:
+        return
+    remove_products([product.pk for product in products], using=using)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)',
+            [(product.pk, product.name, product.description) for product in products],
+        )
+
+
+def remove_products(product_ids, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not product_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in product_ids],
+        )
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Full-text search over product name and description.
+
+    Matching rows are annotated with ``search_rank`` and ordered by relevance;
+    an explicit ``?ordering=`` applied afterwards still takes precedence.
+    Databases without a full-text backend fall back to ``icontains``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        if vendor == 'sqlite':
+            match = fts_match_expression(terms)
+            if not match:
+                return queryset.none()
+            queryset = queryset.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [match],
+            ))
+            # bm25() is lower-is-better; name hits weigh 10x description hits.
+            rank = RawSQL(
+                f'SELECT bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = commerce_product.id',
+                [match],
+                output_field=FloatField(),
+            )
+            return queryset.annotate(search_rank=rank).order_by('search_rank', 'pk')
+
+        if vendor == 'postgresql':
+            query = tsquery_expression(terms)
+            if not query:
+                return queryset.none()
+            queryset = queryset.filter(RawSQL(
+                f"commerce_product.search_vector @@ to_tsquery('{TS_CONFIG}', %s)",
+                [query],
+                output_field=BooleanField(),
+            ))
+            # ts_rank() is higher-is-better, so negate it to share the
+            # ascending ordering (and keyset cursors) with the SQLite path.
+            rank = RawSQL(
+                f"-ts_rank(commerce_product.search_vector, to_tsquery('{TS_CONFIG}', %s))",
+                [query],
+                output_field=FloatField(),
+            )
+            return queryset.annotate(search_rank=rank).order_by('search_rank', 'pk')
+
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,198 @@
+"""
+Bulk synthetic data generation for load testing (``manage.py seed --bulk``).
+
+Products, orders and order lines are written with raw ``executemany``
+INSERTs in fixed-size batches, one transaction per batch, with primary keys
+allocated up front so lines can reference their orders without reading ids
+back; the ORM's per-object insert compilation would otherwise dominate the
+run. Nothing is held in memory beyond the ids/prices later batches need.
+Every random choice comes from a ``random.Random`` seeded from ``--seed`` (and
+per-chunk Faker seeds derived from it), so the same arguments always produce
+the same dataset, with or without a worker pool.
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from multiprocessing import Pool
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from . import cache, category_stats, customers, reporting, search, sync
+from .models import Category, Order, OrderItem, Product
+
+User = get_user_model()
+
+TEXT_CHUNK_SIZE = 1000
+
+
+def product_text(args):
+    """Faker names/descriptions for one chunk; runs in pool workers."""
+    seed, count = args
+    fake = Faker()
+    fake.seed_instance(seed)
+    return [(fake.catch_phrase()[:255], fake.paragraph(nb_sentences=3))
+            for _ in range(count)]
+
+
+def next_pk(model):
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+def insert_rows(model, columns, rows):
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class BulkSeeder:
+    def __init__(self, seed=0, batch_size=5000, workers=0, days=365,
+                 max_lines=5, report=print):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.days = days
+        self.max_lines = max_lines
+        self.report = report
+
+    def run(self, users, categories, products, orders):
+        user_ids = self.create_users(users)
+        category_ids = self.create_categories(categories)
+        catalog = self.create_products(products, category_ids, user_ids)
+        self.create_orders(orders, user_ids, catalog)
+        self.refresh_derived_data()
+
+    def _progress(self, label, done, total, started):
+        rate = done / max(time.monotonic() - started, 1e-9)
+        self.report(f'{label}: {done}/{total} ({rate:,.0f} rows/s)')
+
+    def _batches(self, label, total):
+        started = time.monotonic()
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            yield start, size
+            self._progress(label, start + size, total, started)
+
+    def create_users(self, count):
+        if not count:
+            return list(User.objects.values_list('pk', flat=True))
+        # Hash once: PBKDF2 per user would dominate the whole run.
+        password = make_password('password')
+        offset = (User.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+        ids = []
+        for start, size in self._batches('users', count):
+            users = User.objects.bulk_create([
+                User(username=f'loadtest{offset + n}',
+                     email=f'loadtest{offset + n}@example.com',
+                     password=password)
+                for n in range(start, start + size)
+            ])
+            ids.extend(user.pk for user in users)
+        return ids
+
+    def create_categories(self, count):
+        if not count:
+            return list(Category.objects.values_list('pk', flat=True))
+        categories = Category.objects.bulk_create([
+            Category(name=f'Category {n + 1}') for n in range(count)
+        ], batch_size=self.batch_size)
+        return [category.pk for category in categories]
+
+    def _product_text(self, count):
+        chunks = [(self.seed * 1_000_003 + n, min(TEXT_CHUNK_SIZE, count - start))
+                  for n, start in enumerate(range(0, count, TEXT_CHUNK_SIZE))]
+        if self.workers > 1:
+            with Pool(self.workers) as pool:
+                for chunk in pool.imap(product_text, chunks):
+                    yield from chunk
+        else:
+            for chunk in map(product_text, chunks):
+                yield from chunk
+
+    def create_products(self, count, category_ids, user_ids):
+        """Returns ``[(pk, price)]`` for order generation."""
+        if not count:
+            return list(Product.objects.values_list('pk', 'price'))
+        if not category_ids or not user_ids:
+            raise ValueError('Products need at least one category and user.')
+        text = self._product_text(count)
+        first_pk = next_pk(Product)
+        # Inserted pending (version NULL); refresh_derived_data() stamps them.
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        catalog = []
+        for start, size in self._batches('products', count):
+            rows = []
+            for pk in range(first_pk + start, first_pk + start + size):
+                name, description = next(text)
+                price = Decimal(self.rng.randint(99, 99999)) / 100
+                rows.append((pk, name, description, price, self.rng.randint(0, 1000),
+                             self.rng.choice(category_ids), self.rng.choice(user_ids),
+                             '{}', 0, None, now))
+                catalog.append((pk, price))
+            with transaction.atomic():
+                insert_rows(Product, ['id', 'name', 'description', 'price', 'stock',
+                                      'category_id', 'created_by_id', 'image_variants',
+                                      'revision', 'version', 'updated_at'], rows)
+        return catalog
+
+    def create_orders(self, count, user_ids, catalog):
+        if not count:
+            return
+        if not catalog or not user_ids:
+            raise ValueError('Orders need at least one product and user.')
+        # Spread orders over time; a single creation instant would make
+        # date-range query plans unrealistic.
+        now = timezone.now()
+        window = int(timedelta(days=self.days).total_seconds())
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        first_order_pk, line_pk = next_pk(Order), next_pk(OrderItem)
+        for start, size in self._batches('orders', count):
+            orders, lines = [], []
+            for pk in range(first_order_pk + start, first_order_pk + start + size):
+                picked = self.rng.sample(
+                    catalog, k=min(len(catalog), self.rng.randint(1, self.max_lines)))
+                total = Decimal('0.00')
+                for product_pk, price in picked:
+                    quantity = self.rng.randint(1, 3)
+                    total += price * quantity
+                    lines.append((line_pk, pk, product_pk, quantity, price))
+                    line_pk += 1
+                created_at = now - timedelta(seconds=self.rng.randrange(window))
+                orders.append((pk, self.rng.choice(user_ids),
+                               adapt_datetime(created_at), total))
+            with transaction.atomic():
+                insert_rows(Order, ['id', 'user_id', 'created_at', 'total_price'],
+                            orders)
+                insert_rows(OrderItem, ['id', 'order_id', 'product_id', 'quantity',
+                                        'unit_price'], lines)
+
+    def refresh_derived_data(self):
+        """Bulk inserts skip model signals; rebuild what they would maintain."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Product, Order, OrderItem]):
+                cursor.execute(sql)
+        self.report('Rebuilding search index')
+        search.rebuild_index(connection)
+        self.report('Rebuilding sales rollups')
+        reporting.rebuild()
+        self.report('Stamping catalog versions')
+        sync.stamp_pending()
+        self.report('Rebuilding customer order summaries')
+        customers.rebuild()
+        self.report('Refreshing category statistics')
+        category_stats.refresh()
+        cache.invalidate(Category)
+        cache.invalidate(Product)
@@ -1,28 +1,266 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
 from rest_framework import serializers
-from .models import Category, Product, Order
+from .fastpath import file_url
+from .models import Category, CustomerOrderSummary, DailySalesRollup, Product, \
+    Order, OrderItem
+from .signals import order_updated, orders_placed
+from .stock import InsufficientStock, reserve_stock
+
+
+def insufficient_stock_message(product_ids):
+    return 'Insufficient stock for product(s): %s' % ', '.join(map(str, product_ids))
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves primary keys from ``context['preloaded'][model]`` when a bulk
+    caller has fetched every referenced row up front, instead of running one
+    query per value.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.queryset.model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+# Sync bookkeeping (see commerce.sync), not part of the resource.
+VERSION_FIELDS = ['version', 'updated_at']
+
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = '__all__'
+        exclude = ['product_count', 'min_price', 'max_price', *VERSION_FIELDS]
+
+
+class CategoryStatsSerializer(CategorySerializer):
+    """``CategorySerializer`` plus the read-only product statistics."""
+
+    class Meta(CategorySerializer.Meta):
+        exclude = VERSION_FIELDS
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """``Product.image_variants`` with storage names turned into URLs."""
+
+    def representation_for(self, context):
+        convert = file_url(Product._meta.get_field('image').storage,
+                           context.get('request'))
+
+        def represent(variants):
+            return {variant: {format_name: convert(name)
+                              for format_name, name in formats.items()}
+                    for variant, formats in variants.items()}
+        return represent
+
+    def to_representation(self, value):
+        return self.representation_for(self.context)(value)
+
 
 class ProductSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = VERSION_FIELDS
         # fields = ['id','name','description','price','stock','image','category', ]
 
 
+class ProductSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'price']
+
+
+def snapshot_prices(products):
+    """Current price of each product, read in one query after stock is held."""
+    return {pk: product.price for pk, product in
+            Product.objects.only('price').in_bulk([p.pk for p in products]).items()}
+
+
+def build_items(order, lines, prices):
+    return [OrderItem(order=order, product=product, quantity=quantity,
+                      unit_price=prices[product.pk])
+            for product, quantity in lines.items()]
+
+
+def order_total(lines, prices):
+    return sum((prices[product.pk] * quantity for product, quantity in lines.items()),
+               Decimal('0.00'))
+
+
+class OrderListSerializer(serializers.ListSerializer):
+    batch_size = 1000
+
+    def create(self, validated_data):
+        quantities = Counter()
+        for item in validated_data:
+            quantities.update({product.pk: quantity
+                               for product, quantity in item['lines'].items()})
+
+        with transaction.atomic():
+            reserve_stock(quantities)
+            prices = snapshot_prices(
+                product for item in validated_data for product in item['lines'])
+            orders = [
+                Order(user=item['user'], total_price=order_total(item['lines'], prices))
+                for item in validated_data
+            ]
+            Order.objects.bulk_create(orders, batch_size=self.batch_size)
+            items = [
+                line
+                for order, item in zip(orders, validated_data)
+                for line in build_items(order, item['lines'], prices)
+            ]
+            OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+            orders_placed.send(sender=Order, orders=orders, items=items,
+                               using=orders[0]._state.db)
+        return orders
+
+    def stock_errors(self, validated_data, short_ids):
+        errors = []
+        for index, item in enumerate(validated_data):
+            short = sorted(set(short_ids) & {p.pk for p in item['lines']})
+            if short:
+                errors.append({'index': index, 'errors': {
+                    'products': [insufficient_stock_message(short)]}})
+        return errors
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'quantity', 'unit_price']
+        read_only_fields = ['unit_price']
+        extra_kwargs = {'quantity': {'min_value': 1}}
+
+
 class OrderSerializer(serializers.ModelSerializer):
+    """
+    Lines can be given as ``products`` (one unit per listed id) and/or
+    ``items`` (``{product, quantity}``). ``total_price`` is computed from the
+    unit prices snapshotted when the order is placed. On update, lines given
+    replace the order's lines (products it already had keep their unit
+    price) and only the difference in stock is taken or put back; without
+    lines they are left as they are.
+    """
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+    products = PreloadedPrimaryKeyRelatedField(
+        queryset=Product.objects.all(), many=True, required=False)
+    items = OrderItemSerializer(many=True, required=False)
+
     class Meta:
         model = Order
-        fields = ['id', 'user', 'products', 'total_price', 'created_at']
+        fields = ['id', 'user', 'products', 'items', 'total_price', 'created_at']
+        read_only_fields = ['total_price']
+        list_serializer_class = OrderListSerializer
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('expand_products'):
+            self.fields['products'] = ProductSummarySerializer(many=True,
+                                                               read_only=True)
+
+    def validate(self, attrs):
+        if self.instance is not None and 'products' not in attrs \
+                and 'items' not in attrs:
+            return attrs
+        lines = Counter(attrs.pop('products', []))
+        for item in attrs.pop('items', []):
+            lines[item['product']] += item['quantity']
+        if not lines:
+            raise serializers.ValidationError(
+                {'products': ['An order needs at least one product.']})
+        attrs['lines'] = lines
+        return attrs
+
+    @transaction.atomic
     def create(self, validated_data):
-        # Extract products data
-        products_data = validated_data.pop('products', [])
-        # Create the order without products first
-        order = Order.objects.create(**validated_data)
-        # Add products to the ManyToMany field
-        order.products.set(products_data)
-        return order
\ No newline at end of file
+        lines = validated_data.pop('lines')
+        # Take the stock first so a short order never gets written
+        try:
+            reserve_stock({product.pk: quantity for product, quantity in lines.items()})
+        except InsufficientStock as exc:
+            raise serializers.ValidationError(
+                {'products': [insufficient_stock_message(exc.product_ids)]})
+        prices = snapshot_prices(lines)
+        order = Order.objects.create(total_price=order_total(lines, prices),
+                                     **validated_data)
+        items = OrderItem.objects.bulk_create(build_items(order, lines, prices))
+        orders_placed.send(sender=Order, orders=[order], items=items,
+                           using=order._state.db)
+        return order
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        lines = validated_data.pop('lines', None)
+        using = instance._state.db
+        # Locked so concurrent edits of the order apply one after the other.
+        previous = Order.objects.using(using).select_for_update().get(pk=instance.pk)
+        previous_items = list(previous.items.select_related('order', 'product'))
+        items = previous_items
+        if lines is not None:
+            changes = Counter({product.pk: quantity
+                               for product, quantity in lines.items()})
+            changes.subtract({item.product_id: item.quantity for item in previous_items})
+            try:
+                reserve_stock(changes)
+            except InsufficientStock as exc:
+                raise serializers.ValidationError(
+                    {'products': [insufficient_stock_message(exc.product_ids)]})
+            kept = {item.product_id: item.unit_price for item in previous_items
+                    if item.unit_price is not None}
+            prices = snapshot_prices([product for product in lines
+                                      if product.pk not in kept])
+            prices.update(kept)
+            OrderItem.objects.using(using).filter(order=instance).delete()
+            items = OrderItem.objects.using(using).bulk_create(
+                build_items(instance, lines, prices))
+            instance.total_price = order_total(lines, prices)
+        instance = super().update(instance, validated_data)
+        order_updated.send(sender=Order, order=instance, previous=previous,
+                           previous_items=previous_items, items=items, using=using)
+        return instance
+
+
+class CustomerOrderSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerOrderSummary
+        fields = ['order_count', 'total_spent']
+
+
+class DailySalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailySalesRollup
+        fields = ['day', 'orders', 'quantity', 'revenue']
+
+
+class CategorySalesSerializer(serializers.Serializer):
+    category = serializers.IntegerField(source='category_id')
+    name = serializers.CharField()
+    quantity = serializers.IntegerField(source='total_quantity')
+    revenue = serializers.DecimalField(max_digits=16, decimal_places=2,
+                                       source='total_revenue')
+
+
+class ProductSalesSerializer(serializers.Serializer):
+    product = serializers.IntegerField(source='product_id')
+    name = serializers.CharField()
+    orders = serializers.IntegerField(source='total_orders')
+    quantity = serializers.IntegerField(source='total_quantity')
+    revenue = serializers.DecimalField(max_digits=16, decimal_places=2,
+                                       source='total_revenue')
@@ -0,0 +1,206 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.test.signals import setting_changed
+from rest_framework.authtoken.models import Token
+
+from . import authentication, cache, category_stats, customers, images, outbox, \
+    reporting, search, sync
+from .models import Category, Order, Product
+
+User = get_user_model()
+
+# Sent by every path that places orders (the single and bulk API, seeding),
+# inside the transaction that writes them, with ``orders`` (saved Order
+# instances), ``items`` (their OrderItems, ``order`` and ``product`` loaded)
+# and ``using``. Bulk inserts fire no post_save, so derived data hangs off
+# this instead.
+orders_placed = Signal()
+
+# Sent by OrderSerializer.update inside its transaction, with ``order`` (the
+# saved Order), ``previous`` (the Order as stored before the update),
+# ``previous_items`` and ``items`` (its OrderItems before and after, ``order``
+# and ``product`` loaded; the same list when the lines were not edited) and
+# ``using``.
+order_updated = Signal()
+
+# Sent by commerce.imports inside each chunk's transaction, with ``created``
+# and ``updated`` (saved Product instances), ``previous`` ({pk: values of
+# category_id, price, stock... before the import}) and ``using``; the bulk
+# writes fire no post_save.
+products_imported = Signal()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, using, **kwargs):
+    search.index_products([instance], using=using)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, using, **kwargs):
+    search.remove_products([instance.pk], using=using)
+
+
+TRACKED_FIELDS = ('category_id', 'price', 'stock', 'image')
+
+
+def _tracked_fields(product, previous):
+    # Read from __dict__ so deferred fields are not loaded here; saving a
+    # partially loaded product only writes the fields it has, so the others
+    # keep their previous values.
+    current = {}
+    for name in TRACKED_FIELDS:
+        value = product.__dict__.get(name, previous.get(name))
+        if name == 'image':
+            value = getattr(value, 'name', value) or ''
+        elif name == 'price' and value is not None:
+            # As the database returns it, not the float or str it was set to.
+            value = Product._meta.get_field('price').to_python(value)
+        current[name] = value
+    return current
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_fields(sender, instance, raw, using, **kwargs):
+    # One primary-key read of the tracked columns, paid by saves only.
+    previous = None
+    if not instance._state.adding and instance.pk is not None:
+        previous = Product.objects.using(using).filter(pk=instance.pk) \
+            .values(*TRACKED_FIELDS).first()
+    if previous is not None:
+        previous['image'] = previous['image'] or ''
+    instance._previous_fields = previous
+
+
+@receiver(pre_save, sender=Product)
+def clear_stale_image_variants(sender, instance, **kwargs):
+    previous = instance._previous_fields or {}
+    if _tracked_fields(instance, previous)['image'] != previous.get('image', ''):
+        instance.image_variants = {}
+
+
+@receiver(post_save, sender=Product)
+def refresh_derived_product_data(sender, instance, created, using, **kwargs):
+    previous = instance._previous_fields
+    created = created or previous is None
+    previous = previous or {}
+    current = _tracked_fields(instance, previous)
+    if created or (previous['category_id'], previous['price']) != \
+            (current['category_id'], current['price']):
+        category_stats.refresh({previous.get('category_id'), current['category_id']},
+                               using=using)
+    if current['image'] and (created or current['image'] != previous['image']):
+        images.schedule(instance.pk, using=using)
+    if created or (previous['price'], previous['stock']) != \
+            (current['price'], current['stock']):
+        outbox.publish(outbox.product_events(
+            [(outbox.PRODUCT_CREATED if created else outbox.PRODUCT_CHANGED, instance)],
+            using=using), using=using)
+
+
+@receiver(products_imported)
+def refresh_derived_imported_data(sender, created, updated, previous, using,
+                                  **kwargs):
+    products = created + updated
+    search.index_products(products, using=using)
+    category_stats.refresh(
+        {product.category_id for product in products} |
+        {values['category_id'] for values in previous.values()}, using=using)
+    changes = [(outbox.PRODUCT_CREATED, product) for product in created]
+    changes += [(outbox.PRODUCT_CHANGED, product) for product in updated
+                if (previous[product.pk]['price'], previous[product.pk]['stock']) !=
+                (product.price, product.stock)]
+    outbox.publish(outbox.product_events(changes, using=using), using=using)
+    cache.invalidate(Product, [product.pk for product in products])
+
+
+@receiver(post_delete, sender=Product)
+def refresh_category_stats_on_delete(sender, instance, using, **kwargs):
+    category_stats.refresh({instance.category_id}, using=using)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+def leave_tombstone(sender, instance, using, **kwargs):
+    sync.record_deletion(instance, using=using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Product)
+def stamp_saved_version(sender, using, **kwargs):
+    sync.stamp_on_commit(using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    cache.invalidate(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    authentication.forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_saved_user(sender, instance, **kwargs):
+    authentication.forget_user(instance.pk)
+
+
+@receiver(orders_placed)
+def add_to_sales_rollups(sender, items, using, **kwargs):
+    reporting.record_items(items, using=using)
+
+
+@receiver(order_updated)
+def replace_in_sales_rollups(sender, previous_items, items, using, **kwargs):
+    reporting.record_replaced_items(previous_items, items, using=using)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_from_sales_rollups(sender, instance, using, **kwargs):
+    reporting.record_items(list(instance.items.select_related('product')),
+                           sign=-1, using=using)
+
+
+@receiver(orders_placed)
+def add_to_customer_summaries(sender, orders, using, **kwargs):
+    customers.record_orders(orders, using=using)
+
+
+@receiver(order_updated)
+def move_between_customer_summaries(sender, order, previous, using, **kwargs):
+    customers.record_update(previous, order, using=using)
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_customer_summary(sender, instance, using, **kwargs):
+    customers.record_orders([instance], sign=-1, using=using)
+
+
+@receiver(orders_placed)
+def publish_placed_orders(sender, orders, items, using, **kwargs):
+    outbox.publish(outbox.order_events(orders, items, using=using), using=using)
+
+
+@receiver(order_updated)
+def publish_updated_order(sender, order, previous, previous_items, items, using,
+                          **kwargs):
+    moved = Counter({item.product_id: item.quantity for item in items})
+    moved.subtract({item.product_id: item.quantity for item in previous_items})
+    product_ids = {pk for pk, quantity in moved.items() if quantity}
+    if product_ids or (previous.user_id, previous.total_price) != \
+            (order.user_id, order.total_price):
+        outbox.publish(outbox.order_events([order], items, using=using,
+                                           topic=outbox.ORDER_CHANGED,
+                                           product_ids=product_ids), using=using)
+
+
+@receiver(setting_changed)
+def reset_outbox_sinks(sender, setting, **kwargs):
+    if setting == 'OUTBOX_SINKS':
+        outbox.reset_sinks()
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import cache, sync
+from .models import Product
+
+# Products per conditional UPDATE; keeps the CASE expression and the
+# parameter count well inside SQLite's limits.
+RESERVE_BATCH_SIZE = 250
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f'Insufficient stock for product(s) {self.product_ids}')
+
+
+def reserve_stock(quantities):
+    """
+    Atomically take ``{product_id: quantity}`` out of ``Product.stock``; a
+    negative quantity puts stock back, as when an order's lines are edited.
+
+    Each batch is a single ``UPDATE ... SET stock = stock - n WHERE stock >= n``
+    so the check and the decrement happen inside the database under the row
+    lock; there is no read-modify-write window for concurrent orders to race
+    through. If any product is short, ``InsufficientStock`` is raised and the
+    whole reservation is rolled back.
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+
+    # Lock rows in primary key order so overlapping reservations cannot
+    # deadlock each other.
+    product_ids = sorted(quantities)
+    try:
+        with transaction.atomic():
+            for start in range(0, len(product_ids), RESERVE_BATCH_SIZE):
+                batch = product_ids[start:start + RESERVE_BATCH_SIZE]
+                needed = Case(
+                    *[When(pk=pk, then=Value(quantities[pk])) for pk in batch],
+                    output_field=IntegerField(),
+                )
+                updated = Product.objects.filter(pk__in=batch, stock__gte=needed) \
+                    .update(stock=F('stock') - needed, updated_at=timezone.now(),
+                            # Stock is part of the synced catalog.
+                            version=None)
+                if updated != len(batch):
+                    raise InsufficientStock([])
+    except InsufficientStock:
+        # Re-read after the rollback so partially applied batches don't skew
+        # which products are reported as short.
+        raise InsufficientStock(_short(quantities)) from None
+    cache.invalidate(Product, product_ids)
+    sync.stamp_on_commit()
+
+
+def _short(quantities):
+    available = dict(Product.objects.filter(pk__in=quantities)
+                     .values_list('pk', 'stock'))
+    return [pk for pk, quantity in quantities.items()
+            if available.get(pk, 0) < quantity]
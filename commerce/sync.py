@@ -0,0 +1,179 @@
+"""
+Incremental catalog sync: every change since a client's watermark.
+
+``Category`` and ``Product`` carry a ``version`` from one catalog-wide
+counter (``CatalogVersion``), and deleting either leaves a ``Tombstone``
+with a version of its own. Versions are unique and become visible in
+increasing order: once a client has seen version ``v``, nothing at or below
+``v`` can still appear. So a client keeps the last ``watermark`` it was
+given and asks for what came after it; the work per request is an index
+range scan over the changes, not the catalog.
+
+Writers never take versions themselves: a write sets ``version = NULL``
+(pending) and calls ``stamp_on_commit()``, and once it commits
+``stamp_pending()`` gives the committed pending rows their versions in a
+transaction of its own. The counter row is locked only for that short
+transaction, so order placement and product saves do not queue behind one
+another on it, and stamping transactions commit in version order. Writes
+that bypass ``save()`` (``queryset.update()``, raw SQL) must set
+``version=None`` on the rows they touch and call ``stamp_on_commit()``, as
+``stock``, ``images`` and ``imports`` do. Rows left pending by a process
+that died before its stamp get their versions from the next one.
+
+The feed itself only reads. It takes the counter's committed value first
+and leaves out anything stamped above it, so a stamp committing between its
+reads of categories, products and tombstones cannot put a version in a page
+ahead of lower ones it missed.
+
+Tombstones older than a retention window are removed by
+``prune_tombstones()``; a client whose watermark predates the pruned ones
+must start over from ``since=0``.
+"""
+import heapq
+
+from django.db import connections, transaction
+from django.db.models import F, Max, Min, Value
+
+from .fastpath import compile_serializer
+from .models import CatalogVersion, Category, Product, Tombstone
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+# stamp_on_commit() callbacks per database alias.
+_stampers = {}
+
+
+class WatermarkExpired(Exception):
+    pass
+
+
+def _stamp(querysets, using):
+    """
+    Give the pending rows of ``querysets`` new, distinct versions, one UPDATE
+    per queryset (``version = first + pk - min(pk)``; unused versions in
+    between are harmless). Returns the number of rows stamped.
+    """
+    pending = []
+    for queryset in querysets:
+        queryset = queryset.using(using).filter(version__isnull=True)
+        # A plain read first: the counter is only locked when there is work.
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is not None:
+            pending.append((queryset, bounds['low'], bounds['high']))
+    if not pending:
+        return 0
+    stamped = 0
+    with transaction.atomic(using):
+        first = CatalogVersion.reserve(
+            sum(high - low + 1 for _, low, high in pending), using=using)
+        for queryset, low, high in pending:
+            # Rows committed since the aggregate fall outside the range; the
+            # next stamp takes them.
+            stamped += queryset.filter(pk__range=(low, high)) \
+                .update(version=F('pk') + Value(first - low))
+            first += high - low + 1
+    return stamped
+
+
+def stamp(queryset, using='default'):
+    """Stamp the pending rows of ``queryset``; returns how many."""
+    return _stamp([queryset], using)
+
+
+def stamp_pending(using='default'):
+    """Stamp the committed pending rows of every versioned model."""
+    return _stamp([Category.objects.all(), Product.objects.all(),
+                   Tombstone.objects.all()], using)
+
+
+def stamp_on_commit(using='default'):
+    """Run ``stamp_pending()`` after the current transaction commits, once."""
+    if using not in _stampers:
+        _stampers[using] = lambda: stamp_pending(using)
+    callback = _stampers[using]
+    # Django keeps (savepoint ids, callback, robust) per registration.
+    if not any(entry[1] is callback for entry in connections[using].run_on_commit):
+        # The write has committed by then: a failed stamp (a busy counter
+        # row) is logged, and the next stamp picks the rows up.
+        transaction.on_commit(callback, using=using, robust=True)
+
+
+def record_deletion(instance, using='default'):
+    Tombstone.objects.using(using).create(
+        model=instance._meta.model_name, object_id=instance.pk)
+    stamp_on_commit(using)
+
+
+def _serialized_rows(serializer_class, since, through, limit, context):
+    rows = serializer_class.Meta.model.objects \
+        .filter(version__gt=since, version__lte=through).order_by('version')[:limit]
+    compiled = compile_serializer(serializer_class)
+    if compiled is None:
+        rows = list(rows)
+        return list(zip([row.version for row in rows],
+                        serializer_class(rows, many=True, context=context).data))
+    serialize = compiled.bind(context)
+    columns = dict.fromkeys([*compiled.columns, 'version'])
+    return [(row['version'], serialize(row)) for row in rows.values(*columns)]
+
+
+def changes(serializers, since, limit=DEFAULT_LIMIT, context=None):
+    """
+    The first ``limit`` changes after version ``since`` of the models behind
+    ``serializers`` (``{name: serializer class}``), as ``{'since',
+    'watermark', 'has_more', <name>: [rows]..., 'deleted': {name: [ids]}}``;
+    ``watermark`` is the ``since`` for the next request.
+    """
+    # Everything at or below the committed counter value is stamped and
+    # visible to the reads below.
+    through, pruned_through = CatalogVersion.objects.filter(pk=1) \
+        .values_list('value', 'pruned_through').first() or (0, 0)
+    if 0 < since < pruned_through:
+        raise WatermarkExpired
+
+    context = context or {}
+    names = {serializer_class.Meta.model._meta.model_name: name
+             for name, serializer_class in serializers.items()}
+    streams = [[(version, name, data) for version, data in
+                _serialized_rows(serializer_class, since, through, limit + 1,
+                                 context)]
+               for name, serializer_class in serializers.items()]
+    if since:
+        # A client starting from scratch has nothing to delete.
+        streams.append([
+            (version, 'deleted', (model, object_id)) for version, model, object_id in
+            Tombstone.objects.filter(version__gt=since, version__lte=through,
+                                     model__in=names)
+            .order_by('version')
+            .values_list('version', 'model', 'object_id')[:limit + 1]])
+
+    merged = list(heapq.merge(*streams, key=lambda change: change[0]))
+    page = merged[:limit]
+    result = {'since': since,
+              'watermark': page[-1][0] if page else since,
+              'has_more': len(merged) > limit,
+              **{name: [] for name in serializers},
+              'deleted': {name: [] for name in serializers}}
+    for _, name, data in page:
+        if name == 'deleted':
+            model_name, object_id = data
+            result['deleted'][names[model_name]].append(object_id)
+        else:
+            result[name].append(data)
+    return result
+
+
+def prune_tombstones(before, using='default'):
+    """Delete tombstones older than ``before``; returns how many."""
+    with transaction.atomic(using):
+        tombstones = Tombstone.objects.using(using).filter(deleted_at__lt=before,
+                                                           version__isnull=False)
+        newest = tombstones.aggregate(Max('version'))['version__max']
+        if newest is None:
+            return 0
+        deleted, _ = tombstones.delete()
+        CatalogVersion.objects.using(using).filter(
+            pk=1, pruned_through__lt=newest).update(pruned_through=newest)
+    return deleted
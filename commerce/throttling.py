@@ -0,0 +1,42 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPRateThrottle(SimpleRateThrottle):
+    """Login attempts per client address."""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope,
+                                    'ident': self.get_ident(request)}
+
+
+class LoginUsernameRateThrottle(SimpleRateThrottle):
+    """
+    Login attempts per target account from one client address. Keyed on the
+    pair, so spraying wrong passwords at an account only locks out the
+    sprayer, not the owner logging in from elsewhere.
+    """
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        ident = '%s:%s' % (self.get_ident(request), username.casefold())
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class RegisterIPRateThrottle(LoginIPRateThrottle):
+    scope = 'register_ip'
+
+
+def throttle_wait(request, throttles):
+    """
+    Run ``throttles`` outside an ``APIView``. Returns ``None`` when the request
+    may proceed, otherwise the seconds to wait (possibly ``0``).
+    """
+    waits = [throttle.wait() for throttle in throttles
+             if not throttle.allow_request(request, None)]
+    if not waits:
+        return None
+    return max((wait for wait in waits if wait is not None), default=0)
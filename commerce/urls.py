@@ -1,15 +1,29 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import CategoryViewSet, ProductViewSet, OrderViewSet, RegisterView, \
-    LoginView
+    LoginView, MetricsView, ReportViewSet, CatalogSyncView
 
 router = DefaultRouter()
 router.register('categories', CategoryViewSet)
 router.register('products', ProductViewSet)
 router.register('orders', OrderViewSet)
+router.register('reports', ReportViewSet, basename='report')
 
 urlpatterns = [
     path('', include(router.urls)),
 path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('sync/', CatalogSyncView.as_view(), name='catalog-sync'),
+    path('async/register/', async_views.register, name='register-async'),
+    path('async/login/', async_views.login, name='login-async'),
+    path('async/categories/', async_views.category_list,
+         name='category-list-async'),
+    path('async/categories/<int:pk>/', async_views.category_detail,
+         name='category-detail-async'),
+    path('async/products/', async_views.product_list,
+         name='product-list-async'),
+    path('async/products/<int:pk>/', async_views.product_detail,
+         name='product-detail-async'),
 ]
\ No newline at end of file
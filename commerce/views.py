@@ -1,70 +1,401 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets, permissions, filters
-from .models import Category, Product, Order
-from .serializers import CategorySerializer, ProductSerializer, OrderSerializer
+from rest_framework.decorators import action
+from .models import Category, Product, Order, OrderItem
+from .serializers import CategorySerializer, CategoryStatsSerializer, \
+    ProductSerializer, OrderSerializer, ProductSummarySerializer, \
+    CustomerOrderSummarySerializer, DailySalesSerializer, CategorySalesSerializer, \
+    ProductSalesSerializer
+from . import customers, exports, hashing, imports, metrics, reporting, sync
+from .authentication import token_expired
+from .cache import CachedResponseMixin
+from .fastpath import FastListMixin
+from .middleware import SerializationTimingMixin, serializing
+from .pagination import KeysetPagination
 from .permissions import IsAdminUserOrReadOnly
+from .replicas import ReplicaReadMixin
+from .renderers import PrometheusTextRenderer
+from .search import ProductSearchFilter
+from .stock import InsufficientStock
+from .throttling import LoginIPRateThrottle, LoginUsernameRateThrottle, \
+    RegisterIPRateThrottle
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User
-from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, make_password
 from rest_framework.authtoken.models import Token
 
 
+def export_response(request, name, build):
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in exports.EXPORT_FORMATS:
+        return Response({'error': 'export_format must be one of: %s'
+                                  % ', '.join(exports.EXPORT_FORMATS)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(
+        build(export_format),
+        content_type=exports.EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = \
+        f'attachment; filename="{name}.{export_format}"'
+    return response
+
+
+def _int_ids(values):
+    for value in values:
+        try:
+            yield int(value)
+        except (TypeError, ValueError):
+            continue
+
+
+def _hashing_busy():
+    """
+    Register and login hash on the bounded pool in ``commerce.hashing``, as
+    the async views do, so a login burst can't tie up every worker in PBKDF2.
+    """
+    return Response({'error': 'Server busy, retry shortly.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '1'})
+
+
 class RegisterView(APIView):
+    throttle_classes = [RegisterIPRateThrottle]
+
     def post(self, request):
         username = request.data.get('username')
-        email = request.data.get('email')
+        email = request.data.get('email') or ''
         password = request.data.get('password')
+        if not username or not password:
+            return Response({'error': 'Username and password are required'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         if User.objects.filter(username=username).exists():
             return Response({'error': 'Username already exists'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        user = User.objects.create_user(username=username, email=email,
-                                        password=password)
+        try:
+            password_hash = hashing.call(make_password, password)
+        except hashing.HashingPoolBusy:
+            return _hashing_busy()
+        user = User.objects.create(username=User.normalize_username(username),
+                                   email=User.objects.normalize_email(email),
+                                   password=password_hash)
         token, created = Token.objects.get_or_create(user=user)
 
         return Response({'token': token.key}, status=status.HTTP_201_CREATED)
 
 
 class LoginView(APIView):
+    throttle_classes = [LoginIPRateThrottle, LoginUsernameRateThrottle]
+
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
+        if not username or password is None:
+            return Response({'error': 'Invalid credentials'},
+                            status=status.HTTP_401_UNAUTHORIZED)
 
-        user = authenticate(username=username, password=password)
-        if user is None:
+        user = User.objects.filter(**{User.USERNAME_FIELD: username}).first()
+        try:
+            if user is None:
+                # Hash anyway, as ModelBackend does, so response time doesn't
+                # reveal whether the account exists.
+                hashing.call(make_password, password)
+            else:
+                valid = hashing.call(check_password, password, user.password)
+        except hashing.HashingPoolBusy:
+            return _hashing_busy()
+        if user is None or not valid or not user.is_active:
             return Response({'error': 'Invalid credentials'},
                             status=status.HTTP_401_UNAUTHORIZED)
 
         token, created = Token.objects.get_or_create(user=user)
+        if token_expired(token):
+            token.delete()
+            token = Token.objects.create(user=user)
         return Response({'token': token.key}, status=status.HTTP_200_OK)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, CachedResponseMixin, FastListMixin,
+                      SerializationTimingMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
+    pagination_class = KeysetPagination
+
+    def include_stats(self):
+        return self.request.query_params.get('include') == 'stats'
 
+    def get_serializer_class(self):
+        # ?include=stats adds product_count, min_price and max_price, stored
+        # on the category, so the list stays a single query.
+        if self.include_stats():
+            return CategoryStatsSerializer
+        return super().get_serializer_class()
 
-class ProductViewSet(viewsets.ModelViewSet):
+
+class ProductViewSet(ReplicaReadMixin, CachedResponseMixin, FastListMixin,
+                     SerializationTimingMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [ProductSearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['price', 'stock']
+    pagination_class = KeysetPagination
+
+    # Product writes and what their signals derive from them (search index,
+    # category stats, outbox events) commit together.
+    @transaction.atomic
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+
+    @action(detail=False, methods=['post'], url_path='import',
+            permission_classes=[permissions.IsAdminUser])
+    def import_csv(self, request):
+        # Multipart upload of a CSV keyed by sku; see commerce.imports.
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the CSV as the "file" field'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = imports.import_products(imports.text_stream(upload),
+                                             user=request.user)
+        except imports.InvalidFile as exc:
+            return Response({'error': str(exc)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict())
+
+    @action(detail=False, url_path='export')
+    def export(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(
+            request, 'products',
+            lambda export_format: exports.product_export(queryset, export_format))
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SerializationTimingMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAdminUserOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['user__username', 'products__name']
     ordering_fields = ['total_price', 'created_at']
+    ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    bulk_max_items = 10000
+
+    def expand_products(self):
+        return self.request.query_params.get('expand') == 'products'
+
+    def get_queryset(self):
+        # One query for the whole page of orders' products, whatever the page
+        # size; only the columns the serializer actually renders are loaded.
+        if self.expand_products():
+            fields = ProductSummarySerializer.Meta.fields
+        else:
+            fields = ['id']
+        return super().get_queryset().prefetch_related(
+            Prefetch('products', queryset=Product.objects.only(*fields)),
+            Prefetch('items', queryset=OrderItem.objects.order_by('pk')))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand_products'] = self.expand_products()
+        return context
+
+    @action(detail=False, url_path='mine',
+            permission_classes=[permissions.IsAuthenticated])
+    def mine(self, request):
+        # Newest first, keyset-paginated along order_user_recent_idx; the
+        # summary is one primary-key read of the maintained totals.
+        queryset = self.get_queryset().filter(user=request.user) \
+            .order_by('-created_at', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        with serializing():
+            data = serializer.data
+        response = self.get_paginated_response(data)
+        summary = customers.summary_for(request.user)
+        response.data = {'summary': CustomerOrderSummarySerializer(summary).data,
+                         **response.data}
+        return response
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty list of orders'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {'error': f'At most {self.bulk_max_items} orders per request'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        context = self.get_serializer_context()
+        context['preloaded'] = self.preload_references(items)
+        serializer = self.get_serializer(data=items, many=True, context=context)
+        if not serializer.is_valid():
+            errors = [{'index': index, 'errors': item_errors}
+                      for index, item_errors in enumerate(serializer.errors)
+                      if item_errors]
+            return Response({'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            orders = serializer.save()
+        except InsufficientStock as exc:
+            errors = serializer.stock_errors(serializer.validated_data,
+                                             exc.product_ids)
+            return Response({'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': len(orders),
+                         'ids': [order.pk for order in orders]},
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=False, url_path='export')
+    def export(self, request):
+        try:
+            queryset = exports.orders_created_between(
+                request.query_params.get('created_after'),
+                request.query_params.get('created_before'))
+        except ValueError as exc:
+            return Response({'error': str(exc)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return export_response(
+            request, 'orders',
+            lambda export_format: exports.order_export(queryset, export_format))
+
+    def preload_references(self, items):
+        user_ids, product_ids = set(), set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            user_ids.update(_int_ids([item.get('user')]))
+            products = item.get('products')
+            if isinstance(products, list):
+                product_ids.update(_int_ids(products))
+            lines = item.get('items')
+            if isinstance(lines, list):
+                product_ids.update(_int_ids(
+                    line.get('product') for line in lines if isinstance(line, dict)))
+        return {
+            User: User.objects.in_bulk(user_ids),
+            Product: Product.objects.in_bulk(product_ids),
+        }
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """
+    Sales reports over ``?start=``/``?end=`` (inclusive ISO dates, default
+    the last 30 days), read from the precomputed rollups.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    default_days = 30
+    max_limit = 100
+
+    def date_range(self, request):
+        dates = []
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            try:
+                parsed = parse_date(value) if value else None
+            except ValueError:
+                parsed = None
+            if value and parsed is None:
+                raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+            dates.append(parsed)
+        start, end = dates
+        end = end or timezone.localdate()
+        start = start or end - datetime.timedelta(days=self.default_days - 1)
+        if start > end:
+            raise ValueError('start must not be after end')
+        return start, end
+
+    def report(self, request, build, serializer_class):
+        try:
+            start, end = self.date_range(request)
+            results = build(start, end)
+        except ValueError as exc:
+            return Response({'error': str(exc)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with serializing():
+            data = serializer_class(results, many=True).data
+        return Response({'start': start, 'end': end, 'results': data})
+
+    @action(detail=False)
+    def daily(self, request):
+        return self.report(request, reporting.daily, DailySalesSerializer)
+
+    @action(detail=False)
+    def categories(self, request):
+        return self.report(request, reporting.categories, CategorySalesSerializer)
+
+    @action(detail=False, url_path='top-products')
+    def top_products(self, request):
+        by = request.query_params.get('by', 'revenue')
+        limit = request.query_params.get('limit', '10')
+
+        def build(start, end):
+            if by not in ('revenue', 'quantity'):
+                raise ValueError('by must be revenue or quantity')
+            if not limit.isdigit() or not 1 <= int(limit) <= self.max_limit:
+                raise ValueError(f'limit must be between 1 and {self.max_limit}')
+            return reporting.top_products(start, end, by=by, limit=int(limit))
+        return self.report(request, build, ProductSalesSerializer)
+
+
+class CatalogSyncView(APIView):
+    """
+    Catalog changes after ``?since=<watermark>`` (0 for everything), oldest
+    first, at most ``?limit`` per response. Follow ``watermark`` while
+    ``has_more``; see ``commerce.sync``.
+    """
+    permission_classes = [permissions.AllowAny]
+    serializers = {'categories': CategorySerializer, 'products': ProductSerializer}
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', sync.DEFAULT_LIMIT))
+        except ValueError:
+            since = limit = -1
+        if since < 0 or not 1 <= limit <= sync.MAX_LIMIT:
+            return Response({'error': 'since must be a version >= 0 and limit '
+                                      f'between 1 and {sync.MAX_LIMIT}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            changes = sync.changes(self.serializers, since, limit,
+                                   context={'request': request})
+        except sync.WatermarkExpired:
+            return Response({'error': 'Deletions since this watermark are no '
+                                      'longer kept; sync again from since=0'},
+                            status=status.HTTP_410_GONE)
+        return Response(changes)
+
+
+class MetricsView(APIView):
+    """Request metrics for this process, in the Prometheus text format."""
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [PrometheusTextRenderer]
 
-    # def perform_create(self, serializer):
-    #     serializer.save()
+    def get(self, request):
+        return Response(metrics.registry.render(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -3,6 +3,10 @@ ASGI config for ecomm project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Async views (``commerce.async_views``) run natively on the event loop when
+served through this application; under WSGI they still work but each request
+gets its own short-lived loop.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
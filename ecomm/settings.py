@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings and query counts cover the other middleware.
+    "commerce.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,22 +82,49 @@ WSGI_APPLICATION = "ecomm.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# SQLite unless DB_ENGINE=postgresql, which reads the rest of the DB_*
+# variables below. DB_REPLICA_HOSTS (comma-separated) adds one alias per read
+# replica, used for catalog reads (see commerce.replicas); pointing it at the
+# primary's own host gives a single-instance stand-in for local testing.
+# Behind PgBouncer in transaction pooling mode set DB_POOLER=pgbouncer:
+# server-side cursors (QuerySet.iterator()) do not survive it.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    def postgres_database(host):
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'ecomm'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': host,
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Persistent connections, checked before reuse in each request.
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS':
+                os.environ.get('DB_POOLER', '') == 'pgbouncer',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+                'sslmode': os.environ.get('DB_SSLMODE', 'prefer'),
+            },
+        }
+
+    DATABASES = {'default': postgres_database(os.environ.get('DB_HOST', 'localhost'))}
+    for index, host in enumerate(
+            filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+        DATABASES[f'replica{index}'] = {**postgres_database(host.strip()),
+                                        'TEST': {'MIRROR': 'default'}}
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
     }
-}
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': 'coomm',
-#         'USER': 'postgres',
-#         'PASSWORD': 'pass',
-#         'HOST': 'localhost',
-#         'PORT': '5432',
-#     }
-# }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['commerce.replicas.ReplicaRouter']
 
 
 # Password validation
@@ -167,6 +196,16 @@ LOGGING = {
     }
 }
 
+# Per-request query/timing instrumentation (commerce.middleware): a
+# Server-Timing header, one line per request on the 'ecommerce' logger, and
+# histograms at /api/metrics/ (admin only).
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': 500,
+    'DUPLICATE_QUERY_THRESHOLD': 10,
+}
+
 # Caching
 CACHES = {
     'default': {
@@ -175,6 +214,70 @@ CACHES = {
     }
 }
 
+# Catalog (category/product) GET responses are cached in this alias and
+# invalidated by model signals. LocMemCache is per-process, so other workers
+# only see an invalidation once the timeout expires; point this at a shared
+# backend (Redis/Memcached) in production.
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 300
+# Responses read from a replica can predate the last invalidation; keep them
+# only about as long as the replicas lag (0: do not cache them).
+REPLICA_CACHE_TIMEOUT = int(os.environ.get('REPLICA_CACHE_TIMEOUT', 5))
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'commerce.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    # Same output as DRF's JSON classes, through orjson when it is installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'commerce.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'commerce.renderers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Checked before any password hashing happens.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_username': '5/min',
+        'register_ip': '10/min',
+    },
+}
+
+# Set to False to render and parse JSON with the stdlib even when orjson is
+# installed.
+USE_ORJSON = True
+
+# Password hashing for the async auth endpoints runs on a bounded pool;
+# requests beyond MAX_PENDING queued hashes get a 503 instead of waiting.
+PASSWORD_HASHING_WORKERS = 4
+PASSWORD_HASHING_MAX_PENDING = 64
+
+# Product image variants (see commerce.images) are rendered after commit on
+# a pool of this many threads.
+PRODUCT_IMAGE_WORKERS = 2
+
+# Where manage.py dispatch_outbox delivers order and product events: name ->
+# BACKEND (commerce.outbox.FileSink, commerce.outbox.WebhookSink or any class
+# with send(events)) and its OPTIONS.
+OUTBOX_SINKS = {
+    'file': {
+        'BACKEND': 'commerce.outbox.FileSink',
+        'OPTIONS': {'path': os.path.join(BASE_DIR, 'outbox', 'events.jsonl')},
+    },
+}
+
+# Token -> user lookups are cached for this many seconds; deleting a token or
+# saving its user drops the entry immediately.
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_TIMEOUT = 60
+# Reject (and delete) tokens older than this; None disables expiry.
+TOKEN_EXPIRY_SECONDS = None
+
 # Static files
 # STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
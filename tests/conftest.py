@@ -0,0 +1,61 @@
+import pytest
+from rest_framework.test import APIClient
+from commerce.models import Category, Product, Order
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+
+# Fixtures
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def create_admin_user():
+    admin_user = User.objects.create_superuser(username="admin",
+                                               email="admin@example.com",
+                                               password="password",
+                                               is_superuser=True,
+                                               is_staff=True)
+    return admin_user
+
+
+@pytest.fixture
+def create_user():
+    user = User.objects.create_user(username="user", email="user@example.com",
+                                    password="password")
+    return user
+
+
+@pytest.fixture
+def create_category():
+    category = Category.objects.create(name="Test Category")
+    return category
+
+
+@pytest.fixture
+def create_product(create_category, create_user):
+    product = Product.objects.create(
+        name="Test Product",
+        description="Test Description",
+        price=99.99,
+        stock=10,
+        category=create_category,
+        created_by=create_user,
+    )
+    return product
+
+
+@pytest.fixture
+def create_order(create_user, create_product):
+    order = Order.objects.create(user=create_user, total_price=99.99)
+    order.products.add(create_product)
+    return order
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # The test database is rolled back between tests without firing model
+    # signals, so cached responses from a previous test must not leak.
+    cache.clear()
@@ -0,0 +1,105 @@
+import pytest
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from commerce import hashing
+
+
+@pytest.fixture
+def hash_calls(monkeypatch):
+    calls = []
+    original_run, original_call = hashing.run, hashing.call
+
+    async def counting_run(func, *args):
+        calls.append(func.__name__)
+        return await original_run(func, *args)
+
+    def counting_call(func, *args):
+        calls.append(func.__name__)
+        return original_call(func, *args)
+
+    monkeypatch.setattr(hashing, "run", counting_run)
+    monkeypatch.setattr(hashing, "call", counting_call)
+    return calls
+
+
+@pytest.mark.django_db
+def test_async_register_and_login(api_client, hash_calls):
+    response = api_client.post(reverse("register-async"), {
+        "username": "asyncuser", "email": "a@example.com",
+        "password": "s3cret-pass"}, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert User.objects.get(username="asyncuser").check_password("s3cret-pass")
+
+    response = api_client.post(reverse("login-async"), {
+        "username": "asyncuser", "password": "s3cret-pass"}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert Token.objects.get(user__username="asyncuser").key == \
+        response.json()["token"]
+
+    response = api_client.post(reverse("login-async"), {
+        "username": "asyncuser", "password": "wrong"}, format="json")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert hash_calls == ["make_password", "check_password", "check_password"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["login", "login-async"])
+def test_login_throttled_per_username_before_hashing(api_client, create_user,
+                                                     hash_calls, url_name):
+    for _ in range(5):
+        response = api_client.post(reverse(url_name), {
+            "username": "user", "password": "wrong"}, format="json")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    hashed = len(hash_calls)
+
+    response = api_client.post(reverse(url_name), {
+        "username": "USER", "password": "password"}, format="json")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert len(hash_calls) == hashed
+
+
+@pytest.mark.django_db
+def test_sync_register_and_login_hash_on_the_pool(api_client, hash_calls):
+    response = api_client.post(reverse("register"), {
+        "username": "syncuser", "password": "s3cret-pass"}, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert User.objects.get(username="syncuser").check_password("s3cret-pass")
+
+    response = api_client.post(reverse("login"), {
+        "username": "syncuser", "password": "s3cret-pass"}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    response = api_client.post(reverse("login"), {
+        "username": "nobody", "password": "s3cret-pass"}, format="json")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert hash_calls == ["make_password", "check_password", "make_password"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["login", "login-async"])
+def test_wrong_passwords_do_not_lock_out_other_addresses(api_client,
+                                                         create_user,
+                                                         url_name):
+    for _ in range(6):
+        response = api_client.post(reverse(url_name), {
+            "username": "user", "password": "wrong"}, format="json",
+            REMOTE_ADDR="203.0.113.9")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    response = api_client.post(reverse(url_name), {
+        "username": "user", "password": "password"}, format="json",
+        REMOTE_ADDR="198.51.100.4")
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["login", "login-async"])
+@override_settings(PASSWORD_HASHING_MAX_PENDING=0)
+def test_login_sheds_load_when_pool_is_full(api_client, create_user, url_name):
+    response = api_client.post(reverse(url_name), {
+        "username": "user", "password": "password"}, format="json")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response["Retry-After"] == "1"
@@ -0,0 +1,70 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from commerce.models import Product
+from commerce.search import rebuild_index
+
+
+@pytest.fixture
+def catalog(create_category, create_user):
+    products = Product.objects.bulk_create([
+        Product(name=f"Widget {i}", description="Blue" if i % 2 else "Red",
+                price=i % 4, stock=i, category=create_category,
+                created_by=create_user)
+        for i in range(12)
+    ])
+    from django.db import connection
+    rebuild_index(connection)
+    return products
+
+
+def same_body(sync_response, async_response, sync_path, async_path):
+    assert async_response.status_code == sync_response.status_code
+    assert async_response["Content-Type"] == sync_response["Content-Type"]
+    assert async_response.content == \
+        sync_response.content.replace(sync_path.encode(), async_path.encode())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [
+    {},
+    {"ordering": "-price", "page_size": 5},
+    {"search": "blue", "page_size": 3},
+    {"cursor": "not-a-cursor"},
+])
+def test_async_product_list_matches_sync(api_client, catalog, params):
+    sync_path, async_path = reverse("product-list"), reverse("product-list-async")
+    sync_response = api_client.get(sync_path, params)
+    async_response = api_client.get(async_path, params)
+    same_body(sync_response, async_response, sync_path, async_path)
+
+    if sync_response.status_code == status.HTTP_200_OK and \
+            sync_response.json()["next"]:
+        sync_next = api_client.get(sync_response.json()["next"])
+        async_next = api_client.get(async_response.json()["next"])
+        same_body(sync_next, async_next, sync_path, async_path)
+
+
+@pytest.mark.django_db
+def test_async_details_match_sync(api_client, catalog, create_category):
+    for sync_name, async_name, pk in [
+        ("product-detail", "product-detail-async", catalog[0].pk),
+        ("category-detail", "category-detail-async", create_category.pk),
+        ("product-detail", "product-detail-async", 999999),
+    ]:
+        sync_response = api_client.get(reverse(sync_name, args=[pk]))
+        async_response = api_client.get(reverse(async_name, args=[pk]))
+        same_body(sync_response, async_response, "", "")
+
+    sync_response = api_client.get(reverse("category-list"))
+    async_response = api_client.get(reverse("category-list-async"))
+    same_body(sync_response, async_response, reverse("category-list"),
+              reverse("category-list-async"))
+
+
+@pytest.mark.django_db
+def test_async_catalog_is_read_only(api_client, create_admin_user):
+    api_client.force_authenticate(user=create_admin_user)
+    response = api_client.post(reverse("category-list-async"), {"name": "New"})
+    assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+
+@pytest.fixture
+def token(create_admin_user):
+    return Token.objects.create(user=create_admin_user)
+
+
+def create_category(api_client, key, name="Cached"):
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.post(reverse("category-list"), {"name": name})
+    auth_queries = [q for q in queries if "authtoken_token" in q["sql"]]
+    return response, len(auth_queries)
+
+
+@pytest.mark.django_db
+def test_token_lookup_is_cached(api_client, token):
+    response, lookups = create_category(api_client, token.key)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert lookups == 1
+
+    response, lookups = create_category(api_client, token.key)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert lookups == 0
+
+
+@pytest.mark.django_db
+def test_deleted_token_and_inactive_user_are_rejected(api_client, token,
+                                                      create_admin_user):
+    create_category(api_client, token.key)
+    create_admin_user.is_active = False
+    create_admin_user.save()
+    response, _ = create_category(api_client, token.key)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    create_admin_user.is_active = True
+    create_admin_user.save()
+    create_category(api_client, token.key)
+    token.delete()
+    response, _ = create_category(api_client, token.key)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+@override_settings(TOKEN_EXPIRY_SECONDS=3600)
+def test_expired_token_is_rejected(api_client, token):
+    Token.objects.filter(pk=token.pk).update(
+        created=token.created - timedelta(hours=2))
+
+    response, _ = create_category(api_client, token.key)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert not Token.objects.filter(pk=token.pk).exists()
+
+
+@pytest.mark.django_db
+@override_settings(TOKEN_EXPIRY_SECONDS=3600)
+def test_login_rotates_expired_token(api_client, token):
+    Token.objects.filter(pk=token.pk).update(
+        created=token.created - timedelta(hours=2))
+
+    response = api_client.post(reverse("login"), {"username": "admin",
+                                                  "password": "password"})
+    assert response.data["token"] != token.key
+    response, _ = create_category(api_client, response.data["token"])
+    assert response.status_code == status.HTTP_201_CREATED
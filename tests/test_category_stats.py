@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from commerce import category_stats
+from commerce.models import Category, Product
+
+
+def stats(category):
+    category.refresh_from_db()
+    return category.product_count, category.min_price, category.max_price
+
+
+@pytest.fixture
+def make_product(create_category, create_user):
+    def make(price, category=create_category):
+        return Product.objects.create(name=f"Widget {price}", description="",
+                                      price=price, stock=1, category=category,
+                                      created_by=create_user)
+    return make
+
+
+@pytest.mark.django_db
+def test_stats_follow_product_saves_and_deletes(create_category, make_product):
+    assert stats(create_category) == (0, None, None)
+
+    cheap = make_product("5.00")
+    make_product("20.00")
+    assert stats(create_category) == (2, Decimal("5.00"), Decimal("20.00"))
+
+    cheap.price = "30.00"
+    cheap.save()
+    assert stats(create_category) == (2, Decimal("20.00"), Decimal("30.00"))
+
+    cheap.delete()
+    assert stats(create_category) == (1, Decimal("20.00"), Decimal("20.00"))
+
+
+@pytest.mark.django_db
+def test_moving_a_product_refreshes_both_categories(create_category, make_product):
+    other = Category.objects.create(name="Other")
+    product = make_product("5.00")
+    make_product("8.00")
+
+    product = Product.objects.get(pk=product.pk)
+    product.category = other
+    product.save()
+
+    assert stats(create_category) == (1, Decimal("8.00"), Decimal("8.00"))
+    assert stats(other) == (1, Decimal("5.00"), Decimal("5.00"))
+
+
+@pytest.mark.django_db
+def test_stale_instance_compares_against_stored_values(create_category,
+                                                       make_product):
+    other = Category.objects.create(name="Other")
+    stale = Product.objects.get(pk=make_product("5.00").pk)
+    Product.objects.filter(pk=stale.pk).update(category=other)
+    category_stats.refresh()
+
+    stale.category = create_category
+    stale.save()
+
+    assert stats(create_category) == (1, Decimal("5.00"), Decimal("5.00"))
+    assert stats(other) == (0, None, None)
+
+
+@pytest.mark.django_db
+def test_refresh_repairs_bulk_writes(create_category, create_user):
+    Product.objects.bulk_create([
+        Product(name=f"Widget {i}", description="", price=i + 1, stock=1,
+                category=create_category, created_by=create_user)
+        for i in range(3)
+    ])
+    assert stats(create_category) == (0, None, None)
+
+    category_stats.refresh()
+
+    assert stats(create_category) == (3, Decimal("1.00"), Decimal("3.00"))
+
+
+@pytest.mark.django_db
+def test_category_list_includes_stats_on_request(api_client, create_category,
+                                                 make_product):
+    make_product("5.00")
+    url = reverse("category-list")
+
+    plain = api_client.get(url).json()["results"][0]
+    assert set(plain) == {"id", "name"}
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url, {"include": "stats"})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(queries) == 1
+    assert response.json()["results"][0] == {
+        "id": create_category.pk, "name": "Test Category",
+        "product_count": 1, "min_price": "5.00", "max_price": "5.00"}
+
+
+@pytest.mark.django_db
+def test_stats_are_read_only(api_client, create_admin_user):
+    api_client.force_authenticate(create_admin_user)
+    response = api_client.post(reverse("category-list"),
+                               {"name": "New", "product_count": 99})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Category.objects.get(name="New").product_count == 0
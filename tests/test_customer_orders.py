@@ -0,0 +1,117 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from commerce import customers
+from commerce.models import CustomerOrderSummary, Order
+
+
+@pytest.fixture
+def place_orders(api_client, create_admin_user, create_product):
+    def place(user, count, quantity=1):
+        api_client.force_authenticate(create_admin_user)
+        for _ in range(count):
+            response = api_client.post(reverse("order-list"), {
+                "user": user.pk,
+                "items": [{"product": create_product.pk, "quantity": quantity}],
+            }, format="json")
+            assert response.status_code == status.HTTP_201_CREATED
+        api_client.force_authenticate(None)
+    return place
+
+
+def summary(user):
+    row = CustomerOrderSummary.objects.get(user=user)
+    return row.order_count, row.total_spent
+
+
+@pytest.mark.django_db
+def test_summary_follows_placed_and_deleted_orders(api_client, create_admin_user,
+                                                   create_user, create_product,
+                                                   place_orders):
+    place_orders(create_user, 2)
+    assert summary(create_user) == (2, Decimal("199.98"))
+
+    api_client.force_authenticate(create_admin_user)
+    response = api_client.post(reverse("order-bulk-create"), [
+        {"user": create_user.pk, "products": [create_product.pk]},
+    ], format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert summary(create_user) == (3, Decimal("299.97"))
+
+    Order.objects.filter(user=create_user).first().delete()
+    assert summary(create_user) == (2, Decimal("199.98"))
+    assert customers.rebuild() == 1
+    assert summary(create_user) == (2, Decimal("199.98"))
+
+    create_user.delete()
+    assert not CustomerOrderSummary.objects.exists()
+
+
+@pytest.mark.django_db
+def test_summaries_follow_edited_orders(api_client, create_admin_user, create_user,
+                                        create_product, place_orders):
+    other = User.objects.create_user(username="other", password="password")
+    place_orders(create_user, 2)
+    order = Order.objects.filter(user=create_user).first()
+    api_client.force_authenticate(create_admin_user)
+    url = reverse("order-detail", args=[order.pk])
+
+    response = api_client.patch(url, {"user": other.pk}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert summary(create_user) == (1, Decimal("99.99"))
+    assert summary(other) == (1, Decimal("99.99"))
+
+    response = api_client.put(url, {"user": create_user.pk, "items": [
+        {"product": create_product.pk, "quantity": 3}]}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert summary(create_user) == (2, Decimal("399.96"))
+    assert summary(other) == (0, Decimal("0.00"))
+
+    incremental = sorted(CustomerOrderSummary.objects.values_list(
+        "user_id", "order_count", "total_spent"))
+    customers.rebuild()
+    assert [row for row in incremental if row[1]] == sorted(
+        CustomerOrderSummary.objects.values_list("user_id", "order_count",
+                                                 "total_spent"))
+
+
+@pytest.mark.django_db
+def test_mine_lists_only_own_orders_newest_first(api_client, create_user,
+                                                 place_orders):
+    other = User.objects.create_user(username="other", password="password")
+    place_orders(create_user, 5)
+    place_orders(other, 2, quantity=2)
+
+    api_client.force_authenticate(create_user)
+    url, seen = reverse("order-mine"), []
+    with CaptureQueriesContext(connection) as queries:
+        page = api_client.get(url, {"page_size": 2}).json()
+    # Orders, their products, their lines and the summary.
+    assert len(queries) == 4
+    while True:
+        assert page["summary"] == {"order_count": 5, "total_spent": "499.95"}
+        seen += [order["id"] for order in page["results"]]
+        if not page["next"]:
+            break
+        page = api_client.get(page["next"]).json()
+
+    assert seen == list(Order.objects.filter(user=create_user)
+                        .order_by("-created_at", "-id").values_list("pk", flat=True))
+
+
+@pytest.mark.django_db
+def test_mine_requires_authentication_and_handles_no_orders(api_client, create_user):
+    assert api_client.get(reverse("order-mine")).status_code in (
+        status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+    api_client.force_authenticate(create_user)
+    response = api_client.get(reverse("order-mine"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"summary": {"order_count": 0, "total_spent": "0.00"},
+                               "next": None, "previous": None, "results": []}
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from commerce.exports import order_export, orders_created_between
+from commerce.models import Order, OrderItem
+
+
+def streamed(response):
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.fixture
+def orders(create_user, create_product):
+    result = []
+    for quantity in (1, 2, 3):
+        order = Order.objects.create(user=create_user, total_price=quantity)
+        OrderItem.objects.create(order=order, product=create_product,
+                                 quantity=quantity, unit_price="99.99")
+        result.append(order)
+    return result
+
+
+@pytest.mark.django_db
+def test_order_export_ndjson(api_client, orders, create_product):
+    response = api_client.get(reverse("order-export"),
+                              {"export_format": "ndjson"})
+    records = [json.loads(line) for line in streamed(response).splitlines()]
+
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert [r["id"] for r in records] == [o.pk for o in orders]
+    assert records[1]["items"] == [{"product_id": create_product.pk,
+                                    "quantity": 2, "unit_price": "99.99"}]
+
+
+@pytest.mark.django_db
+def test_order_export_csv_in_chunks(orders, create_product):
+    content = "".join(order_export(orders_created_between(), "csv",
+                                   chunk_size=2))
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert [(int(r["order_id"]), int(r["quantity"])) for r in rows] == [
+        (order.pk, quantity) for order, quantity in zip(orders, (1, 2, 3))]
+
+
+@pytest.mark.django_db
+def test_order_export_rejects_bad_dates(api_client, orders):
+    response = api_client.get(reverse("order-export"),
+                              {"created_after": "yesterday"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_product_export_command(create_product):
+    out = io.StringIO()
+    call_command("export_data", "products", "--format", "ndjson", stdout=out)
+    (record,) = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert record["name"] == "Test Product"
+    assert record["price"] == "99.99"
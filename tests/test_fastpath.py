@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from commerce import fastpath
+from commerce.models import Category, Product
+from commerce.search import rebuild_index
+from commerce.serializers import (CategorySerializer, OrderSerializer,
+                                  ProductSerializer)
+
+
+@pytest.fixture
+def catalog(create_category, create_user):
+    products = Product.objects.bulk_create([
+        Product(name=f"Lamp {i}   \"quoted\"", description="Desk" if i % 2 else "Floor",
+                price=Decimal(i * 7) / 3, stock=i, category=create_category,
+                created_by=create_user,
+                image=f"products/lamp-{i}.png" if i % 3 else None)
+        for i in range(15)
+    ])
+    Product.objects.filter(pk=products[3].pk).update(image="")
+    from django.db import connection
+    rebuild_index(connection)
+    return products
+
+
+@pytest.fixture
+def slow_path(monkeypatch):
+    def use_serializer():
+        cache.clear()
+        monkeypatch.setattr(fastpath, "compile_serializer", lambda cls: None)
+    return use_serializer
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name,params", [
+    ("product-list", {}),
+    ("product-list", {"ordering": "-price", "page_size": 4}),
+    ("product-list", {"ordering": "stock", "page_size": 100}),
+    ("product-list", {"search": "desk", "page_size": 2}),
+    ("category-list", {}),
+])
+def test_fast_list_is_byte_identical(api_client, catalog, slow_path,
+                                     url_name, params):
+    fast = [api_client.get(reverse(url_name), params)]
+    while fast[-1].json()["next"]:
+        fast.append(api_client.get(fast[-1].json()["next"]))
+
+    slow_path()
+    slow = [api_client.get(reverse(url_name), params)]
+    while slow[-1].json()["next"]:
+        slow.append(api_client.get(slow[-1].json()["next"]))
+
+    assert [r.status_code for r in fast] == [r.status_code for r in slow]
+    assert [r.content for r in fast] == [r.content for r in slow]
+
+
+@pytest.mark.django_db
+def test_compiled_rows_match_serializer(catalog):
+    request = APIRequestFactory().get("/api/products/")
+    for serializer_class, model in [(ProductSerializer, Product),
+                                    (CategorySerializer, Category)]:
+        compiled = fastpath.compile_serializer(serializer_class)
+        serialize = compiled.bind({"request": request})
+        rows = model.objects.order_by("pk").values(*compiled.columns)
+        expected = serializer_class(model.objects.order_by("pk"), many=True,
+                                    context={"request": request}).data
+        assert [serialize(row) for row in rows] == expected
+
+
+def test_nested_serializers_are_not_compiled():
+    assert fastpath.compile_serializer(OrderSerializer) is None
+
+
+@pytest.mark.django_db
+def test_binding_compiles_nothing(catalog, monkeypatch):
+    compiled = fastpath.compile_serializer(ProductSerializer)
+    row = Product.objects.filter(pk=catalog[1].pk).values(*compiled.columns).get()
+    monkeypatch.setattr(fastpath, "exec", None, raising=False)
+
+    urls = [compiled.bind({"request": APIRequestFactory().get("/", secure=secure)})
+            (row)["image"] for secure in (False, True)]
+    assert urls == ["http://testserver/media/products/lamp-1.png",
+                    "https://testserver/media/products/lamp-1.png"]
@@ -0,0 +1,72 @@
+import io
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from commerce import images
+from commerce.models import Product
+
+
+def png_bytes(size=(2000, 1000), mode="RGBA"):
+    output = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)) \
+        .save(output, "PNG")
+    return output.getvalue()
+
+
+def test_variants_fit_their_box_and_are_reused(tmp_path):
+    storage = FileSystemStorage(location=tmp_path)
+    source = png_bytes()
+
+    variants = images.render_variants(source, storage)
+
+    assert set(variants) == set(images.DEFAULT_VARIANTS)
+    for variant, (width, height) in images.DEFAULT_VARIANTS.items():
+        assert set(variants[variant]) == {"webp", "jpeg"}
+        for name in variants[variant].values():
+            with Image.open(storage.path(name)) as image:
+                assert image.width <= width and image.height <= height
+    with Image.open(storage.path(variants["card"]["jpeg"])) as image:
+        assert image.format == "JPEG" and image.size == (480, 240)
+
+    files = sorted(path for path in tmp_path.rglob("*") if path.is_file())
+    assert images.render_variants(source, storage) == variants
+    assert sorted(path for path in tmp_path.rglob("*") if path.is_file()) == files
+    assert len(files) == 6
+
+
+@pytest.mark.django_db(transaction=True)
+def test_upload_gets_variants_after_the_request(api_client, create_admin_user,
+                                                create_category, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    api_client.force_authenticate(create_admin_user)
+
+    response = api_client.post(reverse("product-list"), {
+        "name": "Lamp", "description": "Desk", "price": "10.00", "stock": 1,
+        "category": create_category.pk, "created_by": create_admin_user.pk,
+        "image": SimpleUploadedFile("lamp.png", png_bytes(mode="RGB"),
+                                    content_type="image/png"),
+    }, format="multipart")
+    assert response.status_code == status.HTTP_201_CREATED
+    images.shutdown()
+
+    product = Product.objects.get(pk=response.json()["id"])
+    assert set(product.image_variants) == set(images.DEFAULT_VARIANTS)
+    detail = api_client.get(reverse("product-detail", args=[product.pk])).json()
+    thumbnail = detail["image_variants"]["thumbnail"]["webp"]
+    assert thumbnail.startswith("http://testserver/media/products/variants/")
+    assert thumbnail.endswith("/thumbnail.webp")
+    listed = api_client.get(reverse("product-list")).json()["results"][0]
+    assert listed["image_variants"] == detail["image_variants"]
+
+    product.image = SimpleUploadedFile("other.png", png_bytes(size=(50, 50)),
+                                       content_type="image/png")
+    product.save()
+    assert product.image_variants == {}
+    images.shutdown()
+    assert Product.objects.get(pk=product.pk).image_variants["full"]["jpeg"] != \
+        detail["image_variants"]["full"]["jpeg"]
@@ -0,0 +1,142 @@
+import logging
+import time
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from commerce import fastpath, metrics
+from commerce.models import Product
+from commerce.serializers import OrderSerializer
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.registry.clear()
+
+
+def timing(response):
+    return dict(
+        (part.split(";")[0].strip(), part) for part in
+        response["Server-Timing"].split(","))
+
+
+def request_records(caplog):
+    return [record for record in caplog.records
+            if hasattr(record, "request_metrics")]
+
+
+@pytest.mark.django_db
+def test_server_timing_and_log_line(api_client, create_product, caplog):
+    caplog.set_level(logging.INFO, logger="ecommerce")
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(reverse("product-list"))
+    assert response.status_code == status.HTTP_200_OK
+
+    parts = timing(response)
+    assert set(parts) == {"db", "render", "total"}
+    assert f'desc="{len(queries)} queries"' in parts["db"]
+
+    [record] = request_records(caplog)
+    assert record.levelno == logging.INFO
+    assert record.request_metrics["route"] == "product-list"
+    assert record.request_metrics["queries"] == len(queries)
+    assert record.request_metrics["bytes"] == len(response.content)
+
+
+@pytest.mark.django_db
+def test_async_view_queries_are_counted(api_client, create_product):
+    response = api_client.get(reverse("product-list-async"))
+    assert 'desc="0 queries"' not in timing(response)["db"]
+
+
+@pytest.mark.django_db
+@override_settings(REQUEST_METRICS={"DUPLICATE_QUERY_THRESHOLD": 3,
+                                    "SLOW_REQUEST_MS": 60000})
+def test_repeated_statement_is_reported(api_client, create_admin_user,
+                                        create_category, caplog):
+    products = Product.objects.bulk_create([
+        Product(name=f"P{i}", description="", price=1, stock=5,
+                category=create_category, created_by=create_admin_user)
+        for i in range(3)])
+    api_client.force_authenticate(user=create_admin_user)
+    caplog.set_level(logging.INFO, logger="ecommerce")
+
+    # Each product id is resolved with its own SELECT.
+    response = api_client.post(reverse("order-list"), {
+        "user": create_admin_user.pk,
+        "products": [product.pk for product in products],
+    }, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+    [record] = request_records(caplog)
+    assert record.levelno == logging.WARNING
+    assert record.request_metrics["duplicate_query_count"] >= 3
+    assert 'ecomm_duplicate_query_requests_total{route="order-list",method="POST"} 1' \
+        in metrics.registry.render()
+
+
+@pytest.mark.django_db
+@override_settings(REQUEST_METRICS={"SLOW_REQUEST_MS": 0})
+def test_slow_request_is_reported(api_client, caplog):
+    caplog.set_level(logging.INFO, logger="ecommerce")
+    api_client.get(reverse("category-list"))
+    [record] = request_records(caplog)
+    assert record.levelno == logging.WARNING
+    assert record.request_metrics["slow"] is True
+
+
+@pytest.mark.django_db
+def test_serialization_counts_as_render_time(api_client, create_order, caplog,
+                                             monkeypatch):
+    def slow(represent):
+        def wrapper(*args):
+            time.sleep(0.02)
+            return represent(*args)
+        return wrapper
+
+    bind = fastpath.CompiledSerializer.bind
+    monkeypatch.setattr(fastpath.CompiledSerializer, "bind",
+                        lambda self, context: slow(bind(self, context)))
+    monkeypatch.setattr(OrderSerializer, "to_representation",
+                        slow(OrderSerializer.to_representation))
+    caplog.set_level(logging.INFO, logger="ecommerce")
+
+    # The fast path, and a regular serializer.
+    for url in (reverse("product-list"), reverse("order-list")):
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+    assert [record.request_metrics["render_ms"] >= 20
+            for record in request_records(caplog)] == [True, True]
+
+
+@pytest.mark.django_db
+@override_settings(REQUEST_METRICS={"ENABLED": False})
+def test_disabled(api_client):
+    response = api_client.get(reverse("category-list"))
+    assert "Server-Timing" not in response
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(api_client, create_user, create_admin_user):
+    api_client.get(reverse("category-list"))
+    api_client.get(reverse("category-list"))
+
+    api_client.force_authenticate(user=create_user)
+    assert api_client.get(reverse("metrics")).status_code == \
+        status.HTTP_403_FORBIDDEN
+
+    api_client.force_authenticate(user=create_admin_user)
+    response = api_client.get(reverse("metrics"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"].startswith("text/plain")
+    body = response.content.decode()
+    assert "# TYPE ecomm_request_duration_seconds histogram" in body
+    assert 'ecomm_request_duration_seconds_count{route="category-list",method="GET"} 2' \
+        in body
+    assert 'ecomm_request_queries_bucket{route="category-list",method="GET",le="+Inf"} 2' \
+        in body
+    assert 'ecomm_responses_total{route="category-list",method="GET",status="200"} 2' \
+        in body
@@ -0,0 +1,76 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from commerce.models import Order, Product
+
+
+@pytest.fixture
+def products(create_category, create_user):
+    return Product.objects.bulk_create([
+        Product(name=f"Item {i}", description="", price=i + 1, stock=1000,
+                category=create_category, created_by=create_user)
+        for i in range(5)
+    ])
+
+
+def post_bulk(api_client, payload):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.post(reverse("order-bulk-create"), payload,
+                                   format="json")
+    return response, len(queries)
+
+
+def payload(user, products, count):
+    return [{"user": user.pk,
+             "products": [p.pk for p in products[:i % len(products) + 1]],
+             "total_price": "10.00"}
+            for i in range(count)]
+
+
+@pytest.mark.django_db
+def test_bulk_create_orders_with_bounded_queries(api_client, create_admin_user,
+                                                 create_user, products):
+    api_client.force_authenticate(user=create_admin_user)
+
+    response, few_queries = post_bulk(api_client,
+                                      payload(create_user, products, 5))
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["created"] == 5
+
+    response, many_queries = post_bulk(api_client,
+                                       payload(create_user, products, 200))
+    assert response.status_code == status.HTTP_201_CREATED
+    # Only extra insert batches are added, never per-order queries.
+    assert few_queries <= many_queries <= few_queries + 2
+
+    orders = Order.objects.filter(pk__in=response.data["ids"])
+    assert orders.count() == 200
+    assert Order.products.through.objects.filter(order__in=orders).count() == \
+        sum(i % 5 + 1 for i in range(200))
+
+
+@pytest.mark.django_db
+def test_bulk_create_reports_errors_per_item(api_client, create_admin_user,
+                                             create_user, products):
+    api_client.force_authenticate(user=create_admin_user)
+    items = payload(create_user, products, 3)
+    items[1]["products"] = [999999]
+    items[2]["user"] = "nobody"
+
+    response, _ = post_bulk(api_client, items)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [error["index"] for error in response.data["errors"]] == [1, 2]
+    assert "products" in response.data["errors"][0]["errors"]
+    assert "user" in response.data["errors"][1]["errors"]
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_create_requires_admin(api_client, create_user, products):
+    api_client.force_authenticate(user=create_user)
+    response, _ = post_bulk(api_client, payload(create_user, products, 1))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
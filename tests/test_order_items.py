@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from commerce.models import Order, OrderItem, Product
+
+
+@pytest.fixture
+def admin_client(api_client, create_admin_user):
+    api_client.force_authenticate(user=create_admin_user)
+    return api_client
+
+
+@pytest.mark.django_db
+def test_order_total_is_computed_from_price_snapshot(admin_client, create_user,
+                                                     create_product,
+                                                     create_category):
+    other = Product.objects.create(name="Cable", description="", price="5.50",
+                                   stock=10, category=create_category,
+                                   created_by=create_user)
+    response = admin_client.post(reverse("order-list"), {
+        "user": create_user.pk,
+        "products": [create_product.pk],
+        "items": [{"product": other.pk, "quantity": 3}],
+        "total_price": "0.01",
+    }, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["total_price"] == "116.49"
+    assert sorted((i["product"], i["quantity"], i["unit_price"])
+                  for i in response.data["items"]) == sorted([
+        (create_product.pk, 1, "99.99"), (other.pk, 3, "5.50")])
+
+    Product.objects.filter(pk=other.pk).update(price=Decimal("99.00"))
+    order = Order.objects.get(pk=response.data["id"])
+    assert order.total_price == Decimal("116.49")
+    assert OrderItem.objects.get(order=order, product=other).unit_price == \
+        Decimal("5.50")
+    other.refresh_from_db()
+    assert other.stock == 7
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("lines", [
+    {},
+    {"products": []},
+    {"items": [{"product": None, "quantity": 0}]},
+])
+def test_order_requires_valid_lines(admin_client, create_user, create_product,
+                                    lines):
+    if "items" in lines:
+        lines["items"][0]["product"] = create_product.pk
+    response = admin_client.post(reverse("order-list"),
+                                 {"user": create_user.pk, **lines},
+                                 format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Order.objects.exists()
+
+
+@pytest.fixture
+def placed_order(admin_client, create_user, create_product):
+    response = admin_client.post(reverse("order-list"), {
+        "user": create_user.pk,
+        "items": [{"product": create_product.pk, "quantity": 2}],
+    }, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    return Order.objects.get(pk=response.data["id"])
+
+
+@pytest.mark.django_db
+def test_patch_without_lines_keeps_them(admin_client, create_admin_user,
+                                        create_product, placed_order):
+    response = admin_client.patch(reverse("order-detail", args=[placed_order.pk]),
+                                  {"user": create_admin_user.pk}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["user"] == create_admin_user.pk
+    assert [(i["product"], i["quantity"]) for i in response.data["items"]] == \
+        [(create_product.pk, 2)]
+    assert response.data["total_price"] == "199.98"
+    create_product.refresh_from_db()
+    assert create_product.stock == 8
+
+
+@pytest.mark.django_db
+def test_put_replaces_lines_total_and_stock(admin_client, create_user,
+                                            create_product, create_category,
+                                            placed_order):
+    other = Product.objects.create(name="Cable", description="", price="5.50",
+                                   stock=10, category=create_category,
+                                   created_by=create_user)
+    # Placed at 99.99; the line kept keeps its price.
+    Product.objects.filter(pk=create_product.pk).update(price=Decimal("50.00"))
+    url = reverse("order-detail", args=[placed_order.pk])
+
+    response = admin_client.put(url, {
+        "user": create_user.pk,
+        "items": [{"product": create_product.pk, "quantity": 1},
+                  {"product": other.pk, "quantity": 4}],
+    }, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["total_price"] == "121.99"
+    assert sorted((i["product"], i["quantity"], i["unit_price"])
+                  for i in response.data["items"]) == sorted([
+        (create_product.pk, 1, "99.99"), (other.pk, 4, "5.50")])
+    placed_order.refresh_from_db()
+    assert placed_order.total_price == Decimal("121.99")
+    assert dict(Product.objects.values_list("pk", "stock")) == {
+        create_product.pk: 9, other.pk: 6}
+
+    response = admin_client.put(url, {"user": create_user.pk,
+                                      "products": [create_product.pk] * 20},
+                                format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = admin_client.put(url, {"user": create_user.pk, "products": []},
+                                format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert OrderItem.objects.filter(order=placed_order).count() == 2
+    assert dict(Product.objects.values_list("pk", "stock")) == {
+        create_product.pk: 9, other.pk: 6}
@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from commerce.models import Order, Product
+
+
+@pytest.fixture
+def make_orders(create_user, create_category):
+    def make(count):
+        products = Product.objects.bulk_create([
+            Product(name=f"Widget {i}", description="", price=i, stock=1,
+                    category=create_category, created_by=create_user)
+            for i in range(3)
+        ])
+        for _ in range(count):
+            order = Order.objects.create(user=create_user, total_price=3)
+            order.products.set(products)
+    return make
+
+
+def count_queries(api_client, url, params=None):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url, params)
+    assert response.status_code == status.HTTP_200_OK
+    return len(queries), response
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [{}, {"expand": "products"},
+                                    {"search": "widget"}])
+def test_order_list_query_count_is_constant(api_client, make_orders, params):
+    make_orders(1)
+    few, _ = count_queries(api_client, reverse("order-list"), params)
+    make_orders(9)
+    many, response = count_queries(api_client, reverse("order-list"), params)
+
+    assert few == many == 3
+    assert len(response.data["results"]) == 10
+
+
+@pytest.mark.django_db
+def test_order_detail_expands_product_summaries(api_client, create_order,
+                                                create_product):
+    url = reverse("order-detail", args=[create_order.pk])
+    queries, response = count_queries(api_client, url, {"expand": "products"})
+
+    assert queries == 3
+    assert response.data["products"] == [
+        {"id": create_product.pk, "name": "Test Product", "price": "99.99"}]
+
+    _, response = count_queries(api_client, url)
+    assert response.data["products"] == [create_product.pk]
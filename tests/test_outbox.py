@@ -0,0 +1,134 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from commerce import outbox
+from commerce.models import OutboxEvent, Product
+
+
+class RecordingSink:
+    def __init__(self, error=None):
+        self.error = error
+        self.batches = []
+
+    def send(self, events):
+        self.batches.append([event.pk for event in events])
+        if self.error is not None:
+            raise self.error
+
+
+def topics():
+    return list(OutboxEvent.objects.order_by("pk").values_list("topic", "key"))
+
+
+@pytest.fixture
+def admin_client(api_client, create_admin_user):
+    api_client.force_authenticate(create_admin_user)
+    return api_client
+
+
+@pytest.mark.django_db
+def test_orders_and_product_changes_write_events(admin_client, create_user,
+                                                 create_product):
+    OutboxEvent.objects.all().delete()
+    response = admin_client.post(reverse("order-list"), {
+        "user": create_user.pk,
+        "items": [{"product": create_product.pk, "quantity": 3}],
+    }, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    order_id = response.json()["id"]
+
+    assert topics() == [("order.created", str(order_id)),
+                        ("product.changed", str(create_product.pk))]
+    order_event, stock_event = OutboxEvent.objects.order_by("pk")
+    assert order_event.payload["items"] == [
+        {"product": create_product.pk, "quantity": 3, "unit_price": "99.99"}]
+    assert stock_event.payload == {"id": create_product.pk, "price": "99.99",
+                                   "stock": 7, "revision": 2}
+
+    url = reverse("product-detail", args=[create_product.pk])
+    admin_client.patch(url, {"name": "Renamed"}, format="json")
+    assert len(topics()) == 2
+    admin_client.patch(url, {"price": "80.00"}, format="json")
+    assert topics()[-1] == ("product.changed", str(create_product.pk))
+    assert OutboxEvent.objects.last().payload["price"] == "80.00"
+    assert OutboxEvent.objects.last().payload["revision"] == 3
+
+    order_url = reverse("order-detail", args=[order_id])
+    admin_client.patch(order_url, {"user": create_user.pk}, format="json")
+    assert len(topics()) == 3
+    admin_client.patch(order_url, {"products": [create_product.pk]}, format="json")
+    assert topics()[-2:] == [("order.changed", str(order_id)),
+                             ("product.changed", str(create_product.pk))]
+    order_event, stock_event = OutboxEvent.objects.order_by("-pk")[:2][::-1]
+    assert (order_event.payload["total_price"], order_event.payload["items"]) == (
+        "99.99", [{"product": create_product.pk, "quantity": 1, "unit_price": "99.99"}])
+    assert stock_event.payload["stock"] == 9
+    assert stock_event.payload["revision"] == 4
+
+
+@pytest.mark.django_db
+def test_stale_instance_save_keeps_revision(create_product):
+    stale = Product.objects.get(pk=create_product.pk)
+    create_product.stock = 5
+    create_product.save()
+    assert OutboxEvent.objects.last().payload["revision"] == 2
+
+    stale.price = "50.00"
+    stale.save()
+    assert OutboxEvent.objects.last().payload["revision"] == 3
+    assert Product.objects.get(pk=create_product.pk).revision == 3
+
+
+@pytest.mark.django_db
+def test_rejected_order_writes_no_events(admin_client, create_user, create_product):
+    OutboxEvent.objects.all().delete()
+    response = admin_client.post(reverse("order-list"), {
+        "user": create_user.pk,
+        "items": [{"product": create_product.pk, "quantity": 50}],
+    }, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert topics() == []
+
+
+@pytest.mark.django_db
+def test_failed_batches_are_redelivered(create_product):
+    pending = list(OutboxEvent.objects.order_by("pk").values_list("pk", flat=True))
+    assert pending
+    failing = RecordingSink(ConnectionError("down"))
+
+    with pytest.raises(outbox.DeliveryFailed):
+        outbox.dispatch_batch([failing], batch_size=10)
+    event = OutboxEvent.objects.get(pk=pending[0])
+    assert event.dispatched_at is None
+    assert event.attempts == 1 and "down" in event.last_error
+
+    with pytest.raises(outbox.SinkBusy):
+        outbox.dispatch_batch([RecordingSink(outbox.SinkBusy(5))], batch_size=10)
+
+    sink = RecordingSink()
+    assert outbox.dispatch_batch([sink], batch_size=10) == len(pending)
+    assert sink.batches == [pending]
+    assert outbox.dispatch_batch([sink], batch_size=10) == 0
+    assert outbox.backlog() == 0
+
+
+@pytest.mark.django_db
+def test_dispatch_command_drains_to_file_sink(create_product, settings, tmp_path):
+    path = tmp_path / "events.jsonl"
+    settings.OUTBOX_SINKS = {"file": {"BACKEND": "commerce.outbox.FileSink",
+                                      "OPTIONS": {"path": str(path)}}}
+    pending = OutboxEvent.objects.count()
+
+    out = StringIO()
+    call_command("dispatch_outbox", "--once", "--batch-size", "1", stdout=out)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == pending
+    assert lines[0]["topic"] == "product.created"
+    assert lines[0]["payload"]["id"] == create_product.pk
+    assert f"Dispatched {pending} events; 0 pending." in out.getvalue()
@@ -0,0 +1,62 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from commerce.models import Order, Product
+
+
+@pytest.fixture
+def many_products(create_category, create_user):
+    # Few distinct prices so most positions tie on the ordering field.
+    return Product.objects.bulk_create([
+        Product(name=f"Product {i}", description="Bulk", price=i % 3,
+                stock=i % 4, category=create_category, created_by=create_user)
+        for i in range(23)
+    ])
+
+
+def walk(api_client, url, params, link="next"):
+    seen = []
+    response = api_client.get(url, params)
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        seen.append([item["id"] for item in response.json()["results"]])
+        if not response.json()[link]:
+            return seen, response
+        response = api_client.get(response.json()[link])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", ["price", "-price", "-stock"])
+def test_keyset_pages_cover_every_row_once(api_client, many_products,
+                                           ordering):
+    pages, last = walk(api_client, reverse("product-list"),
+                       {"ordering": ordering, "page_size": 5})
+
+    descending = ordering.startswith("-")
+    field = ordering.lstrip("-")
+    expected = sorted(many_products,
+                      key=lambda p: (getattr(p, field), p.pk),
+                      reverse=descending)
+    assert [pk for page in pages for pk in page] == [p.pk for p in expected]
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+
+    back, _ = walk(api_client, last.json()["previous"], {}, link="previous")
+    assert back == pages[-2::-1]
+
+
+@pytest.mark.django_db
+def test_keyset_rejects_tampered_cursor(api_client, many_products):
+    response = api_client.get(reverse("product-list"), {"cursor": "bogus"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_order_list_defaults_to_newest_first(api_client, create_user,
+                                             create_product):
+    orders = [Order.objects.create(user=create_user, total_price=1)
+              for _ in range(3)]
+
+    response = api_client.get(reverse("order-list"))
+    assert [item["id"] for item in response.json()["results"]] == [
+        order.pk for order in reversed(orders)]
@@ -0,0 +1,153 @@
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from commerce import imports, sync
+from commerce.models import Category, OutboxEvent, Product
+from commerce.search import FTS_TABLE
+
+HEADER = "sku,name,description,price,stock,category\n"
+
+
+def run_import(text, user, chunk_size=imports.CHUNK_SIZE):
+    return imports.import_products(StringIO(text), user, chunk_size).as_dict()
+
+
+@pytest.mark.django_db
+def test_creates_updates_and_reports_rows(create_category, create_user):
+    existing = Product.objects.create(sku="A-1", name="Old", description="d",
+                                      price=5, stock=1, category=create_category,
+                                      created_by=create_user)
+    other = Category.objects.create(name="Other")
+    OutboxEvent.objects.all().delete()
+
+    result = run_import(
+        HEADER +
+        "A-1,,,7.50,,Other\n"                     # partial update
+        "B-2,Bolt,Steel,1.25,100,Test Category\n"  # new
+        "B-2,,,,90,\n"                             # later row for the same sku
+        "C-3,Cog,,2,3,Test Category\n"             # new, missing description
+        "D-4,Disc,x,abc,-1,Nowhere\n",
+        create_user)
+
+    assert (result["created"], result["updated"], result["failed"]) == (1, 1, 2)
+    assert result["errors"] == [
+        {"line": 5, "sku": "C-3",
+         "errors": {"description": ["Required for a new product."]}},
+        {"line": 6, "sku": "D-4",
+         "errors": {"price": ["“abc” value must be a decimal number."],
+                    "stock": ["Ensure this value is greater than or equal to 0."],
+                    "category": ["No category named 'Nowhere'."]}},
+    ]
+    existing.refresh_from_db()
+    assert (existing.name, str(existing.price), existing.stock,
+            existing.category_id) == ("Old", "7.50", 1, other.pk)
+    bolt = Product.objects.get(sku="B-2")
+    assert (bolt.name, bolt.stock, bolt.created_by_id) == ("Bolt", 90, create_user.pk)
+    # Both pending for the sync feed.
+    assert bolt.version is existing.version is None
+
+    # Derived data the bulk writes bypassed.
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH 'bolt'")
+        assert cursor.fetchall() == [(bolt.pk,)]
+    other.refresh_from_db()
+    create_category.refresh_from_db()
+    assert (other.product_count, create_category.product_count) == (1, 1)
+    assert sorted(OutboxEvent.objects.values_list("topic", "key")) == [
+        ("product.changed", str(existing.pk)), ("product.created", str(bolt.pk))]
+
+
+@pytest.mark.django_db
+def test_unchanged_rows_are_not_written(create_product):
+    create_product.sku = "SAME"
+    create_product.save()
+    sync.stamp_pending()
+    version = Product.objects.get(pk=create_product.pk).version
+
+    result = run_import(HEADER + "SAME,Test Product,,99.99,10,\n",
+                        create_product.created_by)
+
+    assert (result["updated"], result["unchanged"]) == (0, 1)
+    assert Product.objects.get(pk=create_product.pk).version == version is not None
+
+
+@pytest.mark.django_db
+def test_chunks_use_constant_queries(create_category, create_user):
+    def rows(start, count, price):
+        return "".join(f"S-{i},Item {i},Text,{price},{i},Test Category\n"
+                       for i in range(start, start + count))
+
+    run_import(HEADER + rows(0, 50, 1), create_user)
+    # Half updates, half new SKUs, in one chunk each.
+    with CaptureQueriesContext(connection) as small:
+        run_import(HEADER + rows(0, 5, 2) + rows(100, 5, 2), create_user)
+    assert small.captured_queries
+    with CaptureQueriesContext(connection) as large:
+        run_import(HEADER + rows(0, 40, 3) + rows(200, 40, 3), create_user)
+    assert len(large) == len(small)
+    assert Product.objects.count() == 95
+    assert set(Product.objects.filter(sku__startswith="S-")
+               .values_list("price", flat=True)) == {3, 2, 1}
+
+
+@pytest.mark.django_db
+def test_queries_grow_per_chunk_not_per_row(create_category, create_user):
+    def rows(start, count, cents=99):
+        return "".join(f"S-{i},Item {i},Text,{i % 500}.{cents},{i % 50},Test Category\n"
+                       for i in range(start, start + count))
+
+    with CaptureQueriesContext(connection) as one_chunk:
+        run_import(HEADER + rows(0, 1000), create_user)
+    assert len(one_chunk) <= 15
+    # One chunk of updates, two of new products.
+    with CaptureQueriesContext(connection) as three_chunks:
+        result = run_import(HEADER + rows(0, 1000, cents=49) + rows(1000, 2000),
+                            create_user)
+    assert len(three_chunks) <= 3 * len(one_chunk)
+    assert (result["created"], result["updated"]) == (2000, 1000)
+
+    sync.stamp_pending()
+    assert len(set(Product.objects.values_list("version", flat=True))) == 3000
+
+
+@pytest.mark.django_db
+def test_upload_endpoint(api_client, create_admin_user, create_user,
+                         create_category):
+    url = reverse("product-import-csv")
+    upload = SimpleUploadedFile(
+        "products.csv", ("\ufeff" + HEADER + "N-1,New,Text,3,4,Test Category\n")
+        .encode())
+    assert api_client.post(url, {"file": upload}).status_code in (
+        status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+    api_client.force_authenticate(create_admin_user)
+    upload.seek(0)
+    response = api_client.post(url, {"file": upload})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"created": 1, "updated": 0, "unchanged": 0,
+                               "failed": 0, "errors": []}
+    assert Product.objects.get(sku="N-1").created_by == create_admin_user
+
+    bad = SimpleUploadedFile("products.csv", b"name,price\nx,1\n")
+    response = api_client.post(url, {"file": bad})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_import_command(tmp_path, create_category, create_user):
+    path = tmp_path / "products.csv"
+    path.write_text(HEADER + "K-1,Knob,Text,3,4,Test Category\nK-2,,,,,\n")
+    out, err = StringIO(), StringIO()
+
+    call_command("import_products", str(path), "--user", "user",
+                 stdout=out, stderr=err)
+
+    assert "Created 1, updated 0, unchanged 0, failed 1." in out.getvalue()
+    assert "Line 3: name: Required for a new product." in err.getvalue()
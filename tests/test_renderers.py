@@ -0,0 +1,72 @@
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from commerce import renderers as commerce_renderers
+from commerce.renderers import JSONParser, JSONRenderer
+
+PAYLOADS = [
+    {"id": 1, "price": Decimal("19.90"), "name": "Café     \U0001f600",
+     "created_at": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456,
+                                     tzinfo=datetime.timezone.utc)},
+    [datetime.datetime(2024, 5, 1, 12, 30, 15), datetime.date(2024, 5, 1),
+     datetime.time(9, 15, 0, 500000), timezone.now()],
+    ReturnDict([("detail", ErrorDetail("Not found.", code="not_found"))],
+               serializer=None),
+    {"label": gettext_lazy("Username"), "key": uuid.UUID(int=7),
+     "nested": ({"a": None, "b": True},), "big": 2 ** 70},
+    {1: "integer key"},
+    [],
+]
+
+
+@pytest.mark.parametrize("data", PAYLOADS)
+def test_renderer_matches_drf(data):
+    assert JSONRenderer().render(data) == renderers.JSONRenderer().render(data)
+
+
+def test_renderer_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setattr(commerce_renderers, "orjson", None)
+    for data in PAYLOADS:
+        assert JSONRenderer().render(data) == renderers.JSONRenderer().render(data)
+
+
+def test_indented_output_uses_drf():
+    data = {"a": [1, 2]}
+    assert JSONRenderer().render(data, "application/json; indent=4") == \
+        renderers.JSONRenderer().render(data, "application/json; indent=4")
+
+
+@pytest.mark.parametrize("body", [
+    b'{"products": [1, 2], "name": "caf\xc3\xa9"}',
+    b'{"n": -9223372036854775808, "f": 1.5e-3}',
+    b"[]",
+])
+def test_parser_matches_drf(body):
+    assert JSONParser().parse(BytesIO(body)) == \
+        parsers.JSONParser().parse(BytesIO(body))
+
+
+@pytest.mark.parametrize("body", [b'{"a": ', b'{"a": NaN}', b"\xff"])
+def test_parser_errors_match_drf(body):
+    with pytest.raises(ParseError) as ours:
+        JSONParser().parse(BytesIO(body))
+    with pytest.raises(ParseError) as drf:
+        parsers.JSONParser().parse(BytesIO(body))
+    assert str(ours.value.detail) == str(drf.value.detail)
+
+
+@pytest.mark.django_db
+def test_api_uses_commerce_renderer(api_client, create_product):
+    response = api_client.get(reverse("product-detail", args=[create_product.pk]))
+    assert isinstance(response.accepted_renderer, JSONRenderer)
+    assert response.content == renderers.JSONRenderer().render(response.data)
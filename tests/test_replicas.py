@@ -0,0 +1,117 @@
+import time
+
+import pytest
+from django.core.cache.backends import locmem
+from django.db import connection, router
+from django.urls import reverse
+from rest_framework import status
+
+from commerce import replicas
+from commerce.models import Category, Order, Product
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    return "replica"
+
+
+def test_reads_go_to_replica_only_in_scope(replica):
+    assert router.db_for_read(Product) == "default"
+    with replicas.replica_reads([Product, Category]):
+        assert router.db_for_read(Product) == replica
+        assert router.db_for_read(Category) == replica
+        assert router.db_for_read(Order) == "default"
+    assert router.db_for_read(Product) == "default"
+
+
+def test_write_pins_scope_to_primary(replica):
+    with replicas.replica_reads([Product]):
+        assert router.db_for_read(Product) == replica
+        assert router.db_for_write(Order) == "default"
+        assert router.db_for_read(Product) == "default"
+
+
+def test_replica_instances_are_written_to_primary(replica):
+    product = Product()
+    product._state.db = replica
+    assert router.db_for_write(Product, instance=product) == "default"
+    assert router.db_for_read(Category, instance=product) == "default"
+    category = Category()
+    category._state.db = "default"
+    assert router.allow_relation(product, category)
+    assert not router.allow_migrate(replica, "commerce")
+    assert router.allow_migrate("default", "commerce")
+
+
+def test_no_replicas_routes_nothing(settings):
+    settings.DATABASE_REPLICAS = []
+    with replicas.replica_reads([Product]) as scope:
+        assert scope is None
+        assert router.db_for_read(Product) == "default"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_catalog_reads_use_replica_scope(settings, api_client, create_admin_user,
+                                         create_category):
+    # Single-instance stand-in: the "replica" is the primary itself.
+    settings.DATABASE_REPLICAS = ["default"]
+    scopes = []
+
+    def record(execute, sql, params, many, context):
+        scope = replicas._scope.get()
+        if "commerce_product" in sql:
+            scopes.append(None if scope is None else scope.pinned)
+        return execute(sql, params, many, context)
+
+    api_client.force_authenticate(create_admin_user)
+    with connection.execute_wrapper(record):
+        response = api_client.post(reverse("product-list"), {
+            "name": "Lamp", "description": "Bright", "price": "5.00", "stock": 1,
+            "category": create_category.pk, "created_by": create_admin_user.pk,
+        }, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+        writes, scopes[:] = list(scopes), []
+        response = api_client.get(reverse("product-list"))
+        assert response.status_code == status.HTTP_200_OK
+
+    assert writes and set(writes) == {None}
+    assert scopes and set(scopes) == {False}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_responses_are_cached_briefly(settings, api_client, create_product,
+                                              monkeypatch):
+    settings.DATABASE_REPLICAS = ["default"]
+    settings.REPLICA_CACHE_TIMEOUT = 5
+    url = reverse("product-detail", args=[create_product.pk])
+    reads = []
+
+    def record(execute, sql, params, many, context):
+        if "commerce_product" in sql:
+            reads.append(replicas.reading_from_replica())
+        return execute(sql, params, many, context)
+
+    now = time.time()
+    monkeypatch.setattr(locmem.time, "time", lambda: now)
+    with connection.execute_wrapper(record):
+        first = api_client.get(url)
+        # A hit within REPLICA_CACHE_TIMEOUT...
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code == \
+            status.HTTP_304_NOT_MODIFIED
+        assert reads == [True]
+        # ...and a fresh read from then on, not CATALOG_CACHE_TIMEOUT later.
+        now += 6
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+        assert reads == [True, True]
+
+        now += 6
+        settings.REPLICA_CACHE_TIMEOUT = 0
+        api_client.get(url)
+        api_client.get(url)
+        assert reads == [True, True, True, True]
+
+        settings.DATABASE_REPLICAS = []
+        api_client.get(url)
+        api_client.get(url)
+        assert reads == [True, True, True, True, False]
@@ -0,0 +1,152 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from commerce import reporting
+from commerce.models import DailySalesRollup, Order, Product, ProductSalesRollup
+
+
+def rollup_rows():
+    return (
+        sorted(ProductSalesRollup.objects.values_list(
+            "day", "category_id", "product_id", "orders", "quantity", "revenue")),
+        sorted(DailySalesRollup.objects.values_list(
+            "day", "orders", "quantity", "revenue")),
+    )
+
+
+@pytest.fixture
+def products(create_category, create_user):
+    return Product.objects.bulk_create([
+        Product(name=f"Item {i}", description="", price=price, stock=100,
+                category=create_category, created_by=create_user)
+        for i, price in enumerate(["2.50", "10.00", "7.25"])
+    ])
+
+
+@pytest.fixture
+def place_orders(api_client, create_admin_user, create_user, products,
+                 django_capture_on_commit_callbacks):
+    api_client.force_authenticate(user=create_admin_user)
+
+    def place():
+        with django_capture_on_commit_callbacks(execute=True):
+            single = api_client.post(reverse("order-list"), {
+                "user": create_user.pk,
+                "items": [{"product": products[0].pk, "quantity": 3},
+                          {"product": products[1].pk, "quantity": 1}],
+            }, format="json")
+            bulk = api_client.post(reverse("order-bulk-create"), [
+                {"user": create_user.pk, "products": [products[0].pk]},
+                {"user": create_user.pk, "items": [
+                    {"product": products[2].pk, "quantity": 2}]},
+            ], format="json")
+        assert single.status_code == bulk.status_code == status.HTTP_201_CREATED
+    return place
+
+
+@pytest.mark.django_db
+def test_placing_orders_updates_rollups(place_orders, products):
+    place_orders()
+    today = timezone.localdate()
+
+    daily = DailySalesRollup.objects.get(day=today)
+    assert (daily.orders, daily.quantity) == (3, 7)
+    assert daily.revenue == sum(o.total_price for o in Order.objects.all())
+
+    first = ProductSalesRollup.objects.get(product=products[0])
+    assert (first.orders, first.quantity, str(first.revenue)) == (2, 4, "10.00")
+
+    incremental = rollup_rows()
+    assert reporting.rebuild() == (3, 1)
+    assert rollup_rows() == incremental
+
+
+@pytest.mark.django_db
+def test_deleting_an_order_subtracts_it(place_orders, products,
+                                        django_capture_on_commit_callbacks):
+    place_orders()
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.filter(items__product=products[2]).delete()
+
+    incremental = rollup_rows()
+    assert DailySalesRollup.objects.get().orders == 2
+    assert ProductSalesRollup.objects.get(product=products[2]).quantity == 0
+
+    reporting.rebuild()
+    # rebuild() drops the emptied product row rather than keeping zeros.
+    assert rollup_rows()[1] == incremental[1]
+    assert not ProductSalesRollup.objects.filter(product=products[2]).exists()
+
+
+@pytest.mark.django_db
+def test_editing_an_order_replaces_its_lines(api_client, place_orders, products,
+                                             create_user,
+                                             django_capture_on_commit_callbacks):
+    place_orders()
+    order = Order.objects.get(items__product=products[2])
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.put(reverse("order-detail", args=[order.pk]), {
+            "user": create_user.pk,
+            "items": [{"product": products[1].pk, "quantity": 2}],
+        }, format="json")
+    assert response.status_code == status.HTTP_200_OK
+
+    incremental = rollup_rows()
+    assert ProductSalesRollup.objects.get(product=products[2]).quantity == 0
+    second = ProductSalesRollup.objects.get(product=products[1])
+    assert (second.orders, second.quantity, str(second.revenue)) == (2, 3, "30.00")
+    assert DailySalesRollup.objects.get().orders == 3
+
+    reporting.rebuild()
+    assert rollup_rows()[1] == incremental[1]
+
+
+@pytest.mark.django_db
+def test_report_endpoints(api_client, place_orders, create_user, products):
+    place_orders()
+    today = timezone.localdate().isoformat()
+
+    response = api_client.get(reverse("report-daily"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["end"] == today
+    assert response.json()["results"] == [
+        {"day": today, "orders": 3, "quantity": 7, "revenue": "34.50"}]
+
+    response = api_client.get(reverse("report-categories"),
+                              {"start": today, "end": today})
+    [category] = response.json()["results"]
+    assert (category["quantity"], category["revenue"]) == (7, "34.50")
+
+    response = api_client.get(reverse("report-top-products"),
+                              {"by": "quantity", "limit": 2})
+    assert [(row["product"], row["quantity"]) for row in response.json()["results"]] \
+        == [(products[0].pk, 4), (products[2].pk, 2)]
+
+    for params in [{"start": "yesterday"}, {"start": today, "end": "2000-01-01"}]:
+        response = api_client.get(reverse("report-daily"), params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = api_client.get(reverse("report-top-products"), {"by": "stock"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    api_client.force_authenticate(user=create_user)
+    assert api_client.get(reverse("report-daily")).status_code == \
+        status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_backfill_command(place_orders):
+    place_orders()
+    expected = rollup_rows()
+    ProductSalesRollup.objects.all().delete()
+    DailySalesRollup.objects.update(orders=0)
+
+    today = timezone.localdate()
+    call_command("backfill_sales_rollups",
+                 "--start", (today - datetime.timedelta(days=40)).isoformat(),
+                 "--end", today.isoformat(), "--days-per-batch", "7")
+    assert rollup_rows() == expected
@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+
+def get(api_client, url, params=None, **headers):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url, params, **headers)
+    return response, len(queries)
+
+
+@pytest.mark.django_db
+def test_product_list_is_served_from_cache(api_client, create_product):
+    url = reverse("product-list")
+    first, first_queries = get(api_client, url, {"ordering": "price"})
+    second, second_queries = get(api_client, url,
+                                 {"ordering": "price", "utm": "ignored"})
+
+    assert first_queries > 0
+    assert second_queries == 0
+    assert second.status_code == status.HTTP_200_OK
+    assert second.content == first.content
+    assert second["ETag"] == first["ETag"]
+
+    _, other_queries = get(api_client, url, {"ordering": "-price"})
+    assert other_queries > 0
+
+
+@pytest.mark.django_db
+def test_if_none_match_returns_not_modified(api_client, create_category):
+    url = reverse("category-detail", args=[create_category.pk])
+    response, _ = get(api_client, url)
+
+    cached, queries = get(api_client, url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.content == b""
+    assert queries == 0
+
+
+@pytest.mark.django_db
+def test_saves_and_deletes_invalidate_precisely(api_client, create_category,
+                                                create_product):
+    list_url = reverse("product-list")
+    detail_url = reverse("product-detail", args=[create_product.pk])
+    category_url = reverse("category-detail", args=[create_category.pk])
+    for url in (list_url, detail_url, category_url):
+        get(api_client, url)
+
+    create_product.name = "Renamed"
+    create_product.save()
+
+    response, queries = get(api_client, detail_url)
+    assert queries > 0
+    assert response.json()["name"] == "Renamed"
+    response, queries = get(api_client, list_url)
+    assert queries > 0
+    assert response.json()["results"][0]["name"] == "Renamed"
+    _, queries = get(api_client, category_url)
+    assert queries == 0
+
+    create_product.delete()
+    response, _ = get(api_client, list_url)
+    assert response.json()["results"] == []
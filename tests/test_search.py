@@ -0,0 +1,75 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+
+from commerce.models import Product
+from commerce.search import FTS_TABLE
+
+
+def make_product(category, user, name, description):
+    return Product.objects.create(name=name, description=description,
+                                  price=10, stock=1, category=category,
+                                  created_by=user)
+
+
+def search(api_client, term, **params):
+    response = api_client.get(reverse("product-list"),
+                              {"search": term, **params})
+    assert response.status_code == status.HTTP_200_OK
+    return [item["name"] for item in response.json()["results"]]
+
+
+@pytest.mark.django_db
+def test_product_search_ranks_name_matches_first(api_client, create_category,
+                                                 create_user):
+    make_product(create_category, create_user, "Desk Lamp",
+                 "Pairs well with any laptop stand.")
+    make_product(create_category, create_user, "Laptop",
+                 "Lightweight laptop for professionals.")
+    make_product(create_category, create_user, "Blender", "Smoothies.")
+
+    assert search(api_client, "lapt") == ["Laptop", "Desk Lamp"]
+    assert search(api_client, "laptop lamp") == ["Desk Lamp"]
+    assert search(api_client, '"') == []
+
+
+@pytest.mark.django_db
+def test_product_search_explicit_ordering_wins(api_client, create_category,
+                                               create_user):
+    cheap = make_product(create_category, create_user, "Laptop", "Budget.")
+    pricey = make_product(create_category, create_user, "Laptop Pro",
+                          "A laptop.")
+    Product.objects.filter(pk=pricey.pk).update(price=500)
+    Product.objects.filter(pk=cheap.pk).update(price=5)
+
+    assert search(api_client, "laptop", ordering="-price") == [
+        "Laptop Pro", "Laptop"]
+
+
+@pytest.mark.django_db
+def test_product_search_index_follows_saves_and_deletes(
+        api_client, create_product):
+    assert search(api_client, "test") == ["Test Product"]
+
+    create_product.name = "Renamed Widget"
+    create_product.description = "Nothing to see."
+    create_product.save()
+    assert search(api_client, "test") == []
+    assert search(api_client, "widget") == ["Renamed Widget"]
+
+    create_product.delete()
+    assert search(api_client, "widget") == []
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index(api_client, create_product):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    assert search(api_client, "test") == []
+
+    call_command("rebuild_search_index", stdout=StringIO())
+    assert search(api_client, "test") == ["Test Product"]
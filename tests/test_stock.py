@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+from django.db import OperationalError, connection
+from django.urls import reverse
+from rest_framework import serializers, status
+
+from commerce.models import Order, Product
+from commerce.serializers import OrderSerializer
+
+
+def order_payload(user, *products):
+    return {"user": user.pk, "products": [p.pk for p in products],
+            "total_price": "1.00"}
+
+
+@pytest.mark.django_db
+def test_order_creation_decrements_stock(api_client, create_admin_user,
+                                         create_user, create_product):
+    api_client.force_authenticate(user=create_admin_user)
+    response = api_client.post(reverse("order-list"),
+                               order_payload(create_user, create_product),
+                               format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    create_product.refresh_from_db()
+    assert create_product.stock == 9
+
+
+@pytest.mark.django_db
+def test_order_rejected_when_out_of_stock(api_client, create_admin_user,
+                                          create_user, create_product,
+                                          create_category):
+    in_stock = Product.objects.create(
+        name="Spare", description="", price=1, stock=5,
+        category=create_category, created_by=create_user)
+    Product.objects.filter(pk=create_product.pk).update(stock=0)
+    api_client.force_authenticate(user=create_admin_user)
+
+    response = api_client.post(reverse("order-list"),
+                               order_payload(create_user, in_stock,
+                                             create_product),
+                               format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert str(create_product.pk) in response.data["products"][0]
+
+    response = api_client.post(reverse("order-bulk-create"), [
+        order_payload(create_user, in_stock),
+        order_payload(create_user, create_product),
+    ], format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [e["index"] for e in response.data["errors"]] == [1]
+    assert str(create_product.pk) in \
+        response.data["errors"][0]["errors"]["products"][0]
+
+    assert not Order.objects.exists()
+    in_stock.refresh_from_db()
+    assert in_stock.stock == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_orders_never_oversell(create_user, create_category):
+    product = Product.objects.create(
+        name="Limited", description="", price=1, stock=25,
+        category=create_category, created_by=create_user)
+    workers, attempts_per_worker = 8, 6
+    placed, rejected, errors = [], [], []
+    start = threading.Barrier(workers)
+
+    def place_orders():
+        start.wait()
+        try:
+            for _ in range(attempts_per_worker):
+                while True:
+                    serializer = OrderSerializer(
+                        data=order_payload(create_user, product))
+                    try:
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save()
+                    except OperationalError:
+                        # SQLite reports a busy database instead of blocking;
+                        # the transaction rolled back, so just retry it.
+                        continue
+                    except serializers.ValidationError as exc:
+                        assert "Insufficient stock" in str(exc.detail["products"])
+                        rejected.append(1)
+                    else:
+                        placed.append(1)
+                    break
+        except Exception as exc:
+            # Raised in a thread it would only be printed; fail the test.
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=place_orders) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    product.refresh_from_db()
+    assert len(placed) == 25
+    assert len(rejected) == workers * attempts_per_worker - 25
+    assert product.stock == 0
+    assert Order.objects.count() == 25
@@ -0,0 +1,163 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from commerce import sync
+from commerce.models import Category, Product, Tombstone
+
+
+@pytest.fixture
+def catalog(create_category, create_user):
+    return [Product.objects.create(name=f"Widget {i}", description="", price=i + 1,
+                                   stock=10, category=create_category,
+                                   created_by=create_user)
+            for i in range(5)]
+
+
+# Writers stamp their rows once they commit, so these tests commit for real.
+
+
+def pull(api_client, since=0, limit=100):
+    response = api_client.get(reverse("catalog-sync"), {"since": since, "limit": limit})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_full_sync_pages_by_version(api_client, catalog, create_category):
+    pages, since = [], 0
+    while True:
+        page = pull(api_client, since, limit=2)
+        pages.append(page)
+        assert page["watermark"] > since or not page["has_more"]
+        since = page["watermark"]
+        if not page["has_more"]:
+            break
+
+    assert [category["id"] for page in pages for category in page["categories"]] == \
+        [create_category.pk]
+    assert [product["id"] for page in pages for product in page["products"]] == \
+        [product.pk for product in catalog]
+    assert pages[0]["products"][0] == api_client.get(
+        reverse("product-detail", args=[catalog[0].pk])).json()
+    assert pull(api_client, since) == {
+        "since": since, "watermark": since, "has_more": False,
+        "categories": [], "products": [],
+        "deleted": {"categories": [], "products": []}}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delta_has_only_changes_and_tombstones(api_client, catalog, create_user):
+    since = pull(api_client)["watermark"]
+
+    catalog[1].price = "99.00"
+    catalog[1].save()
+    deleted_pk = catalog[3].pk
+    catalog[3].delete()
+    category = Category.objects.create(name="New")
+
+    with CaptureQueriesContext(connection) as queries:
+        delta = pull(api_client, since)
+    # Counter, categories, products, tombstones; reads only, none of them
+    # depending on catalog size.
+    assert len(queries) == 4
+    assert all(query["sql"].startswith("SELECT") for query in queries)
+    assert [product["id"] for product in delta["products"]] == [catalog[1].pk]
+    assert delta["products"][0]["price"] == "99.00"
+    assert [row["id"] for row in delta["categories"]] == [category.pk]
+    assert delta["deleted"] == {"categories": [], "products": [deleted_pk]}
+    assert delta["watermark"] > since
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stock_taken_by_orders_is_synced(api_client, catalog, create_admin_user,
+                                         create_user):
+    since = pull(api_client)["watermark"]
+    api_client.force_authenticate(create_admin_user)
+    response = api_client.post(reverse("order-list"), {
+        "user": create_user.pk,
+        "items": [{"product": catalog[0].pk, "quantity": 2},
+                  {"product": catalog[2].pk, "quantity": 1}],
+    }, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+    delta = pull(api_client, since)
+    assert [(row["id"], row["stock"]) for row in delta["products"]] == [
+        (catalog[0].pk, 8), (catalog[2].pk, 9)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stamp_gives_bulk_rows_distinct_versions(create_category, create_user):
+    sync.stamp_pending()
+    Product.objects.bulk_create([
+        Product(name=f"Bulk {i}", description="", price=1, stock=1,
+                category=create_category, created_by=create_user)
+        for i in range(4)])
+
+    assert sync.stamp(Product.objects.all()) == 4
+    assert sync.stamp(Product.objects.all()) == 0
+    versions = list(Product.objects.values_list("version", flat=True))
+    assert len(set(versions)) == 4
+    create_category.refresh_from_db()
+    assert min(versions) > create_category.version
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pruned_watermarks_must_resync(api_client, catalog):
+    since = pull(api_client)["watermark"]
+    catalog[0].delete()
+    # Only stamped tombstones are pruned.
+    Tombstone.objects.create(model="product", object_id=0)
+
+    assert sync.prune_tombstones(timezone.now() + datetime.timedelta(seconds=1)) == 1
+
+    response = api_client.get(reverse("catalog-sync"), {"since": since})
+    assert response.status_code == status.HTTP_410_GONE
+    assert len(pull(api_client)["products"]) == 4
+    assert api_client.get(reverse("catalog-sync"), {"limit": 0}).status_code == \
+        status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pending_rows_wait_for_their_stamp(api_client, catalog):
+    since = pull(api_client)["watermark"]
+    # A write that bypasses save() and stamp_on_commit().
+    Product.objects.filter(pk=catalog[0].pk).update(price="42.00", version=None)
+
+    # The feed itself does not stamp.
+    assert pull(api_client, since)["products"] == []
+    sync.stamp_pending()
+    assert [row["id"] for row in pull(api_client, since)["products"]] == [catalog[0].pk]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stamp_between_stream_reads_is_not_skipped(api_client, catalog,
+                                                   create_category):
+    since = pull(api_client)["watermark"]
+    interleaved = []
+
+    def stamp_before_products(execute, sql, params, many, context):
+        # A concurrent writer commits and stamps after the categories are
+        # read, before the products are.
+        if not interleaved and '"commerce_product"' in sql and \
+                '"version" >' in sql:
+            interleaved.append(True)
+            create_category.name = "Renamed"
+            create_category.save()
+            catalog[0].price = "42.00"
+            catalog[0].save()
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(stamp_before_products):
+        first = pull(api_client, since)
+    assert interleaved
+    assert (first["categories"], first["products"]) == ([], [])
+
+    second = pull(api_client, first["watermark"])
+    assert [row["name"] for row in second["categories"]] == ["Renamed"]
+    assert [row["id"] for row in second["products"]] == [catalog[0].pk]